@@ -10,22 +10,23 @@ import sys
 sys.path.insert(1, os.path.join(sys.path[0], '..'))
 
 from tkinter import *
-from tkinter import messagebox
-from tkinter import filedialog
 from collections import OrderedDict
 
 from ZipNotes.Row import RowOne
 from ZipNotes.RowArray import RowArray
-from ZipNotes.ZipBase import ZipArchiveBase
-from GUI.Preferences import *
+from ZipNotes.Session import LastSession
+
+# Dialogs, preferences, and the archive classes are imported upon first use,
+# so that the window paints as soon as possible.
 
 class AppGUI(Tk):
 
     FILE_TYPE = ".zdb"
     NOTE_FILE = "ZibDB.txt"
+    POLL_MS = 20
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, *kwargs)
+    def __init__(self, *args, home_dir='.', **kwargs):
+        super().__init__(*args, **kwargs)
         self.title("ZipDB: My Notes")
         self.changed = False
         self.frames = list()
@@ -34,8 +35,15 @@ class AppGUI(Tk):
         self.entText = None
         self.lbEvent = None
         self.lbSel = None
+        self.lbIndex = None
         self.archive = None
+        self.notes = None
+        self.cache = None
+        self.ids = list()
+        self.session = LastSession(home_dir)
         self.setup()
+        self.protocol("WM_DELETE_WINDOW", self.do_quit)
+        self.show_session()
 
     def setup(self):
         self.set_center()
@@ -74,6 +82,7 @@ class AppGUI(Tk):
 
         zmenu = Menu(menubar, tearoff=0)
         zmenu.add_command(label="Locations...", command=self.do_tool_locations)
+        zmenu.add_command(label="Catalog...", command=self.do_tool_catalog)
         menubar.add_cascade(label="Tools", menu=zmenu)
 
         zmenu = Menu(menubar, tearoff=0)
@@ -106,15 +115,20 @@ class AppGUI(Tk):
         self.entText.insert(END, "Just\n\tsome text!")
         self.entText.bind("<KeyRelease>",  self.on_delta_text)
 
-    def show_archive_title(self):
-        if not self.archive:
-            return
-        archive = self.archive.file
+    def show_archive_title(self, archive=None):
+        if not archive:
+            if not self.archive:
+                return
+            archive = self.archive.file
         if len(archive) > 30:
             archive = "..." + archive[-27:]
         self.title(archive)
 
     def do_archive_create(self):
+        from tkinter import messagebox
+        from tkinter import simpledialog
+        from GUI.Preferences import Dp1
+        from ZipNotes.ZipBase import ZipArchiveBase
         self._save_edit()
         location = Dp1.Load('.')['Database']
         archive = simpledialog.askstring(location, "Archive name:")
@@ -140,6 +154,9 @@ class AppGUI(Tk):
             messagebox.showerror("Archive Creation Error", "Unable to create " + archive)
 
     def do_archive_open(self):
+        from tkinter import filedialog
+        from GUI.Preferences import Dp1
+        from ZipNotes.ZipBase import ZipArchiveBase
         self._save_edit()
         location = Dp1.Load('.')['Database']
         archive = filedialog.askopenfilename(
@@ -152,8 +169,27 @@ class AppGUI(Tk):
         self.show_archive_title()
 
     def do_tool_locations(self):
+        from GUI.Preferences import Dp1
         pref = Dp1(self, '.')       
 
+    def do_tool_catalog(self):
+        from tkinter import messagebox
+        from GUI.Preferences import Dp1
+        from ZipNotes.Catalog import ZipCatalog
+        location = Dp1.Load('.')['Database']
+        catalog = ZipCatalog(location)
+        catalog.refresh()
+        lines = list()
+        for path, entry in catalog.entries():
+            if 'error' in entry:
+                lines.append("%s: unreadable (%s)" % (os.path.basename(path), entry['error']))
+                continue
+            lines.append("%s: %d rows, %d bytes" % (
+                os.path.basename(path), entry['rows'], entry['size']))
+        if not lines:
+            lines.append("No archives in " + location)
+        messagebox.showinfo("Catalog", "\n".join(lines))
+
     def do_edit_new(self):
         pass
 
@@ -170,9 +206,11 @@ class AppGUI(Tk):
         pass
 
     def do_quit(self):
+        self.save_session()
         self.destroy()
 
     def do_about(self):
+        from tkinter import messagebox
         messagebox.showinfo("ZipDB", "Work In Process!")
 
     def on_lbclicked(self, ve):
@@ -181,6 +219,7 @@ class AppGUI(Tk):
         if len(values):
             index = int(values[0])
             self.lbSel = w.get(index)
+            self.lbIndex = index
             self.do_edit_sel()
 
     def on_delta(self):
@@ -192,6 +231,7 @@ class AppGUI(Tk):
         return True
 
     def _create_archive(self):
+        from tkinter import messagebox
         if not self.archive:
             return
         note = RowOne()
@@ -209,16 +249,119 @@ class AppGUI(Tk):
         return True
 
     def show_archive_first(self):
-        # TODO - Show the first entry
-        messagebox.showinfo("TODO", "Show the first entry.")
+        if not self.archive:
+            return
+        self.changed = False
+        self.show_notes(RowArray.FromString(self.archive.read_archive(AppGUI.NOTE_FILE)))
+
+    def show_notes(self, notes, key=None):
+        ''' Display the notes, selecting the row whose id is "key" - else the
+        first. Rows already listed (as from the last session) are not re-listed. '''
+        from tkinter import messagebox
+        from ZipNotes.RowCache import RowCache
+        if not notes:
+            messagebox.showerror("Archive Error", "Unable to read " + self.archive.file)
+            return
+        self.notes = notes
+        self.cache = RowCache(notes)
+        subjects = notes.get_subjects()
+        ids = list(subjects)
+        if ids[:len(self.ids)] == self.ids and \
+                list(self.lbEvent.get(0, END)) == [subjects[zkey] for zkey in self.ids]:
+            for zkey in ids[len(self.ids):]:
+                self.lbEvent.insert(END, subjects[zkey])
+        else:
+            self.lbEvent.delete(0, END)
+            for zkey in ids:
+                self.lbEvent.insert(END, subjects[zkey])
+        self.ids = ids
+        if self.ids:
+            index = self.ids.index(key) if key in subjects else 0
+            self.lbEvent.selection_clear(0, END)
+            self.lbEvent.selection_set(index)
+            self.lbEvent.see(index)
+            self.lbSel = subjects[self.ids[index]]
+            self.lbIndex = index
+            if not self.changed:
+                self._load_edit()
+                self.changed = False
+
+    def show_session(self):
+        ''' Paint the last session from its snapshot, then read the archive in
+        the background. False if there was no last session. '''
+        if not self.session.load() or not os.path.exists(str(self.session.archive)):
+            return False
+        self.ids = list()
+        self.lbEvent.delete(0, END)
+        for key, subject in self.session.page:
+            self.ids.append(key)
+            self.lbEvent.insert(END, subject)
+        index = self.session.index
+        if index is not None and index < len(self.ids) and \
+                self.ids[index] == self.session.selected:
+            self.lbEvent.selection_set(index)
+            self.lbEvent.see(index)
+            self.lbIndex = index
+            self.lbSel = self.lbEvent.get(index)
+            self._load_edit()  # The row itself is read from the archive.
+        self.changed = False
+        self.show_archive_title(self.session.archive)
+        self.after_idle(self.refresh_archive)
+        return True
+
+    def refresh_archive(self):
+        ''' Read the last session's archive upon a worker thread, then show it. '''
+        import threading
+        from ZipNotes.ZipBase import ZipArchiveBase
+        archive = ZipArchiveBase(self.session.archive)
+        self.archive = archive
+        result = dict()
+        def work():
+            result['notes'] = RowArray.FromString(archive.read_archive(AppGUI.NOTE_FILE))
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        self._poll_archive(worker, archive, result)
+
+    def _poll_archive(self, worker, archive, result):
+        if worker.is_alive():
+            self.after(AppGUI.POLL_MS, self._poll_archive, worker, archive, result)
+            return
+        if archive is not self.archive:
+            return  # Another archive was opened meanwhile.
+        key = None
+        if self.lbIndex is not None and self.lbIndex < len(self.ids):
+            key = self.ids[self.lbIndex]
+        if not self.session.is_current():
+            self.changed = False  # Anything painted from the snapshot is out of date.
+        self.show_notes(result.get('notes'), key)
+
+    def save_session(self):
+        ''' Snapshot the archive, first page of subjects, and selection. '''
+        if not self.archive or not self.notes:
+            return False
+        return self.session.save(self.archive.file, self.ids,
+                                 self.notes.get_subjects(), self.lbIndex)
 
     def _save_edit(self):
         pass
 
     def _load_edit(self):
+        if self.cache and self.lbIndex is not None and self.lbIndex < len(self.ids):
+            row = self.cache.focus(self.ids, self.lbIndex)
+            if row:
+                self._show_row(row)
+                return
         if self.lbSel:
             self.read_only(self.entTime, self.lbSel)
 
+    def _show_row(self, row):
+        self.read_only(self.entTime, row.time_string(local=True))
+        self.entSubject.delete(0, last=END)
+        self.entSubject.insert(0, row.subject)
+        self.entText.delete('1.0', END)
+        self.entText.insert(END, row.data)
+        self.changed = False  # Painting a row is not an edit.
+
     def read_only(self, obj, text):
         obj.config(state='normal')
         obj.delete(0, last=END)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+# Mission: Opportunity to store large, repeated, RowOne.data payloads but
+# once. Rows refer to their payload by content hash, and .compact() drops
+# any payload that is no longer referenced.
+
+# Status: Testing Success
+# Date Created: 2026-10-19
+
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+import hashlib
+from collections import Counter
+
+from ZipNotes.Row import RowOne
+from ZipNotes.RowArray import RowArray
+from ZipNotes.Schema import FieldSchema
+
+class BlobStore:
+
+    '''
+    Content-addressed payload storage for an archive (ZipArchiveBase.) Row data
+    at / above the threshold is archived once, as "blobs/<hash>", with the
+    archived row referring to same via its BLOB_KEY. Reference counts are
+    taken from the latest copy of every archived RowArray, so .compact() will
+    never drop a payload that any row still uses.
+    '''
+
+    BLOB_DIR = "blobs/"
+    BLOB_KEY = "_blob"
+    THRESHOLD = 4096
+
+    def __init__(self, archive, threshold=None):
+        self._archive = archive
+        self._threshold = threshold if threshold else BlobStore.THRESHOLD
+        self._cache = dict()
+
+    @property
+    def archive(self):
+        ''' Query the archive. '''
+        return self._archive
+
+    @staticmethod
+    def Hash(payload):
+        ''' The content hash for a str or bytes payload. The two types never collide. '''
+        if isinstance(payload, str):
+            return hashlib.sha256(b's' + payload.encode('utf-8')).hexdigest()
+        return hashlib.sha256(b'b' + bytes(payload)).hexdigest()
+
+    def is_large(self, payload):
+        ''' Check to see if a payload belongs in a blob. '''
+        return isinstance(payload, (str, bytes)) and len(payload) >= self._threshold
+
+    def blobs(self):
+        ''' Return the hashes of every archived blob. '''
+        if not self._archive.exists():
+            return set()
+        results = set()
+        for name in self._archive.list():
+            if name.startswith(BlobStore.BLOB_DIR):
+                results.add(name[len(BlobStore.BLOB_DIR):])
+        return results
+
+    def put(self, payload, known=None, pending=None):
+        ''' Archive a payload, unless it has been archived before. Returns the hash.
+        Use "known" to provide the set of blobs already present. Given a "pending"
+        dictionary, new payloads are added to it ({hash: payload}) for the caller
+        to archive, rather than being archived one at a time. '''
+        zhash = BlobStore.Hash(payload)
+        if known is None:
+            known = self.blobs()
+        if zhash not in known and pending is not None:
+            pending[zhash] = payload
+            known.add(zhash)
+        elif zhash not in known:
+            name = BlobStore.BLOB_DIR + zhash
+            if self._archive.exists():
+                bOkay = self._archive.archive_next(payload, name)
+            else:
+                bOkay = self._archive.archive_first(payload, name)
+            if not bOkay:
+                return False
+            known.add(zhash)
+        return zhash
+
+    def get(self, zhash):
+        ''' Retrieve a payload by hash. False if not found. '''
+        if zhash in self._cache:
+            return self._cache[zhash]
+        result = self._archive.read_archive(BlobStore.BLOB_DIR + zhash)
+        if result is not False:
+            self._cache[zhash] = result
+        return result
+
+    def dehydrate(self, row, known=None, pending=None):
+        ''' Return an archivable copy of a row, moving any large payload into a blob. '''
+        result = RowOne.FromString(dict(row._data))
+        if self.is_large(row.data):
+            zhash = self.put(row.data, known, pending)
+            if not zhash:
+                return False
+            result._data['data'] = ''
+            result._data[BlobStore.BLOB_KEY] = zhash
+        return result
+
+    def hydrate(self, row):
+        ''' Restore the payload of a row previously returned by .dehydrate().
+        False if the blob cannot be read - in which case the row is unchanged. '''
+        zhash = row._data.get(BlobStore.BLOB_KEY)
+        if zhash:
+            payload = self.get(zhash)
+            if payload is False:
+                return False
+            row._data['data'] = payload
+            del row._data[BlobStore.BLOB_KEY]
+        return row
+
+    def save(self, rows, file):
+        ''' Archive a RowArray, storing each large payload once. The new payloads,
+        and the rows, are archived in a single write. Prior copies of the file
+        are superseded (see .compact()). False on error. '''
+        known = self.blobs()
+        pending = dict()
+        results = RowArray()
+        for key in rows._db:
+            row = rows._db[key]
+            if not row:
+                continue
+            zrow = self.dehydrate(row, known, pending)
+            if not zrow:
+                return False
+            results.append(zrow)
+        members = [(pending[zhash], BlobStore.BLOB_DIR + zhash) for zhash in pending]
+        members.append((RowArray.ToList(results), file))
+        return self._archive.archive_batch(members)
+
+    def load(self, file):
+        ''' Read a RowArray previously archived via .save(). False on error -
+        including when any payload is missing. '''
+        results = RowArray.FromString(self._archive.read_archive(file))
+        if not results:
+            return results
+        for key in results._db:
+            if self.hydrate(results._db[key]) is False:
+                return False
+        return results
+
+    def refcounts(self):
+        ''' Count the row references to each archived blob. Files that are not
+        RowArrays are skipped. False if any file cannot be read (or a typed
+        RowArray decoded) - as its references would otherwise go uncounted. '''
+        results = Counter(dict.fromkeys(self.blobs(), 0))
+        for name in self._archive.row_files():
+            data = self._archive.read_archive(name)
+            if data is False:
+                return False
+            rows = FieldSchema.Parse(data, self._archive)
+            if rows is False:
+                if FieldSchema.IsTyped(data):
+                    return False
+                continue # Not a RowArray.
+            for key in rows._db:
+                zhash = rows._db[key].get(BlobStore.BLOB_KEY)
+                if zhash:
+                    results[zhash] += 1
+        return results
+
+    def compact(self):
+        ''' Re-create the archive without superseded files, nor unreferenced blobs.
+        False, leaving the archive as-is, if any file cannot be read. '''
+        if not self._archive.exists():
+            return False
+        counts = self.refcounts()
+        if counts is False:
+            return False
+        self._cache.clear()
+        def keep(name):
+            if name.startswith(BlobStore.BLOB_DIR):
+                return counts[name[len(BlobStore.BLOB_DIR):]] > 0
+            return True
+        return self._archive.compact(keep)
+
+
+if __name__ == '__main__':
+    import tempfile
+    from ZipNotes.ZipBase import ZipArchiveBase
+    with tempfile.TemporaryDirectory() as folder:
+        archive = ZipArchiveBase(os.path.join(folder, 'blobs.zdb'))
+        store = BlobStore(archive, threshold=100)
+        assert(BlobStore.Hash("abc") != BlobStore.Hash(b"abc"))
+        db = RowArray()
+        big = "Large payload! " * 1000
+        for ss in range(20):
+            row = db.create()
+            row.subject = "Clone %d" % ss
+            row.data = big
+        small = db.create()
+        small.data = "tiny"
+        binary = db.create()
+        binary.data = b"\x00" * 500
+        assert(store.save(db, "ZibDB.txt"))
+        assert(len(store.blobs()) == 2)
+        assert(os.path.getsize(archive.file) < len(big) * 2)
+        db2 = store.load("ZibDB.txt")
+        assert(db2.count() == 22)
+        assert(db2.lookup(small.id).data == "tiny")
+        assert(db2.lookup(binary.id).data == b"\x00" * 500)
+        for key in db2._db:
+            assert(BlobStore.BLOB_KEY not in db2._db[key].keys())
+        assert(db2.lookup(row.id).data == big)
+        assert(store.refcounts()[BlobStore.Hash(big)] == 20)
+        # Payloads no longer referenced are dropped, once compacted:
+        db2.delete(binary)
+        for key in list(db2._db)[:10]:
+            db2._db[key].data = "edited"
+        assert(store.save(db2, "ZibDB.txt"))
+        counts = store.refcounts()
+        assert(counts[BlobStore.Hash(big)] == 10)
+        assert(counts[BlobStore.Hash(binary.data)] == 0)
+        assert(store.compact())
+        assert(len(store.blobs()) == 1)
+        assert(len(archive.list()) == 2)
+        db3 = BlobStore(archive).load("ZibDB.txt")
+        assert(db3.count() == 21)
+        assert(db3.lookup(row.id).data == big)
+        # Files that are not RowArrays are skipped:
+        archive.archive_next("Not a RowArray", "notes.txt")
+        assert(store.refcounts()[BlobStore.Hash(big)] == 10)
+        assert(store.compact())
+        assert(len(store.blobs()) == 1)
+        # ...but unreadable files stop a compaction, rather than losing payloads:
+        from ZipNotes.Codecs import AESGCM, Codec, Cipher
+        if AESGCM:
+            ZipArchiveBase(archive.file, Codec(cipher=Cipher("Sesame"))).archive_next("Sealed", "sealed.txt")
+            assert(store.refcounts() == False)
+            assert(store.compact() == False)
+            assert(len(store.blobs()) == 1)
+        # A missing payload fails the load, rather than losing the data:
+        archive.compact(lambda name: not name.startswith(BlobStore.BLOB_DIR))
+        assert(BlobStore(archive).load("ZibDB.txt") == False)
+        zrow = RowOne.FromString({'id': 'x', BlobStore.BLOB_KEY: BlobStore.Hash(big)})
+        assert(store.hydrate(zrow) == False)
+        assert(zrow.get(BlobStore.BLOB_KEY) == BlobStore.Hash(big))
+    print("Testing Success")
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+# Mission: Opportunity to summarize every archive in a "Database" folder,
+# without opening every ZIP each time we want to list, or search, same.
+
+# Status: Testing Success
+# Date Created: 2026-10-19
+
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from collections import Counter
+from collections import OrderedDict
+
+from ZipNotes.RowArray import RowArray
+from ZipNotes.ZipBase import ZipArchiveBase
+from ZipNotes.Schema import FieldSchema
+
+class ZipCatalog:
+
+    '''
+    A persistent, folder-wide, catalog of archives. Each archive is summarized
+    by size, modification time, row count, time range, as well as by its most
+    popular subjects. The catalog is saved into a sidecar file in the folder.
+    Use .refresh() to re-read only those archives that have changed.
+    '''
+
+    FILE_NAME = "ZipDB.cat"
+    FILE_TYPE = ".zdb"
+    TOP_SUBJECTS = 10
+
+    def __init__(self, folder='.'):
+        self._folder = os.path.normpath(os.path.abspath(folder))
+        self._entries = OrderedDict()
+        self.load()
+
+    @property
+    def file(self):
+        ''' Query the sidecar file-name. '''
+        return os.path.join(self._folder, ZipCatalog.FILE_NAME)
+
+    def load(self):
+        ''' Load the sidecar file. False if none was found / readable. '''
+        try:
+            with open(self.file) as fh:
+                self._entries = OrderedDict(eval(fh.read()))
+            return True
+        except:
+            self._entries = OrderedDict()
+            return False
+
+    def save(self):
+        ''' Save the sidecar file. A partial write never replaces the
+        previous catalog. False on error. '''
+        tmp = self.file + '.tmp'
+        try:
+            with open(tmp, 'w') as fh:
+                fh.write(repr(dict(self._entries)))
+            os.replace(tmp, self.file)
+            return True
+        except:
+            return False
+
+    def refresh(self):
+        ''' Re-summarize any new or changed archive, dropping those that have been
+        removed. Unchanged archives are only stat()ed. Returns the number of
+        archives re-read. '''
+        tally = 0
+        found = OrderedDict()
+        for name in sorted(os.listdir(self._folder)):
+            if not name.lower().endswith(ZipCatalog.FILE_TYPE):
+                continue
+            path = os.path.join(self._folder, name).replace('\\', '/')
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = self._entries.get(path)
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                found[path] = entry
+                continue
+            found[path] = ZipCatalog.Summarize(path, stat)
+            tally += 1
+        if tally or len(found) != len(self._entries):
+            self._entries = found
+            self.save()
+        return tally
+
+    def entries(self):
+        ''' Return the (path, summary) for every cataloged archive. '''
+        for path in self._entries:
+            yield path, self._entries[path]
+
+    def lookup(self, path):
+        ''' Retrieve the summary for an archive - by absolute, or relative, path.
+        None if not cataloged. '''
+        return self._entries.get(os.path.normpath(os.path.abspath(path)).replace('\\', '/'))
+
+    def search(self, text):
+        ''' Return the paths to every archive whose name, or top subjects,
+        contain the text. Case insensitive. '''
+        text = text.lower()
+        results = list()
+        for path, entry in self.entries():
+            if text in os.path.basename(path).lower():
+                results.append(path)
+                continue
+            for subject in entry['subjects']:
+                if text in str(subject).lower():
+                    results.append(path)
+                    break
+        return results
+
+    @staticmethod
+    def Summarize(path, stat=None):
+        ''' Read an archive to create its catalog entry. Typed RowArrays (see
+        Schema.FieldSchema) are counted, too. Members that are not RowArrays
+        are counted as 'unread'. An archive that cannot be opened at all has
+        an 'error' - rather than looking empty. '''
+        if not stat:
+            stat = os.stat(path)
+        entry = OrderedDict()
+        entry['size'] = stat.st_size
+        entry['mtime'] = stat.st_mtime
+        entry['rows'] = 0
+        entry['time_min'] = None
+        entry['time_max'] = None
+        entry['unread'] = 0
+        subjects = Counter()
+        archive = ZipArchiveBase(path)
+        try:
+            members = archive.row_files()
+        except Exception as ex:
+            entry['error'] = str(ex) if str(ex) else type(ex).__name__
+            members = list()
+        for member in members:
+            rows = FieldSchema.ReadRows(archive, member)
+            if not rows:
+                entry['unread'] += 1
+                continue
+            for key in rows._db:
+                row = rows._db[key]
+                entry['rows'] += 1
+                subjects[row.subject] += 1
+                if entry['time_min'] is None or row.time < entry['time_min']:
+                    entry['time_min'] = row.time
+                if entry['time_max'] is None or row.time > entry['time_max']:
+                    entry['time_max'] = row.time
+        entry['subjects'] = [subject for subject, count in subjects.most_common(ZipCatalog.TOP_SUBJECTS)]
+        return dict(entry)
+
+
+if __name__ == '__main__':
+    import tempfile
+    from ZipNotes.Row import RowOne
+    with tempfile.TemporaryDirectory() as folder:
+        for ss, name in enumerate(('one.zdb', 'two.zdb')):
+            rows = RowArray()
+            for count in range(ss + 2):
+                row = RowOne(time=1000 + count)
+                row.subject = name + " subject"
+                rows.append(row)
+            assert(ZipArchiveBase(os.path.join(folder, name)).archive_first(
+                RowArray.ToString(rows), "ZibDB.txt"))
+        with open(os.path.join(folder, 'ignored.txt'), 'w') as fh:
+            fh.write('Not an archive')
+        cat = ZipCatalog(folder)
+        assert(cat.refresh() == 2)
+        assert(os.path.exists(cat.file))
+        assert(cat.refresh() == 0)
+        cat = ZipCatalog(folder)
+        assert(len(list(cat.entries())) == 2)
+        entry = cat.lookup(os.path.join(folder, 'two.zdb'))
+        assert(entry['rows'] == 3)
+        assert(entry['time_min'] == 1000 and entry['time_max'] == 1002)
+        assert(entry['subjects'] == ['two.zdb subject'])
+        assert(entry['unread'] == 0 and 'error' not in entry)
+        here = os.getcwd()
+        try:
+            os.chdir(folder)
+            assert(cat.lookup('two.zdb') == entry)
+            assert(cat.lookup(os.path.join('.', 'two.zdb')) == entry)
+        finally:
+            os.chdir(here)
+        with open(os.path.join(folder, 'corrupt.zdb'), 'wb') as fh:
+            fh.write(b'Not a ZIP')
+        assert(cat.refresh() == 1)
+        assert('error' in cat.lookup(os.path.join(folder, 'corrupt.zdb')))
+        os.unlink(os.path.join(folder, 'corrupt.zdb'))
+        assert(len(cat.search('ONE.ZDB SUB')) == 1)
+        assert(len(cat.search('subject')) == 2)
+        assert(cat.search('nope') == [])
+        os.unlink(os.path.join(folder, 'one.zdb'))
+        assert(cat.refresh() == 0)
+        assert(len(list(cat.entries())) == 1)
+    print("Testing Success")
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+
+# Mission: Opportunity to let the GUI list, search indexes, and sync jobs
+# learn what changed in a RowArray - without diffing the whole database.
+# Every change is numbered, and can be persisted, so consumers resume from
+# the last number they saw.
+
+# Status: Testing Success
+# Date Created: 2026-10-19
+
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from ZipNotes.WriteLog import WriteAheadLog, LoggedRowArray
+
+class ChangeFeed:
+
+    '''
+    Publish each create, append, update, delete, and clear made to a RowArray
+    as a (seq, op, id, fields) change. Sequence numbers only ever increase.
+    The "fields" are the keys that changed - None for a delete or clear. An
+    update that changes nothing is not published. Given a file, changes are
+    logged (see WriteLog.WriteAheadLog) so that the feed, too, survives a
+    restart. A LoggedRowArray needs no file: each change is carried in the
+    very log record of its edit, so that a crash can never keep the one
+    without the other. Attach a feed once its rows have been loaded.
+    '''
+
+    def __init__(self, rows, file=None, retain=None, **window):
+        self._rows = rows
+        self._retain = retain
+        self._callbacks = list()
+        self._changes = list()
+        self._seq = 0
+        self._log = None
+        self._shared = isinstance(rows, LoggedRowArray) # Changes ride in the rows' log.
+        self._shadow = dict() # id: the row's fields, as last published.
+        for key in rows._db.keys():
+            row = rows._db[key]
+            if row:
+                self._shadow[key] = dict(row._data)
+        if self._shared:
+            if file:
+                raise ValueError("A LoggedRowArray logs its changes with its rows.")
+            for record in rows.log.records():
+                if record[0] == 'seq':
+                    self._seq = max(self._seq, record[3]) # As of the last checkpoint.
+                elif len(record) > 3:
+                    self._changes.append(tuple(record[3]))
+        elif file:
+            self._log = WriteAheadLog(file, **window)
+            for change in self._log.records():
+                self._changes.append(tuple(change))
+        if self._changes:
+            self._seq = max(self._seq, self._changes[-1][0])
+        rows._feed = self
+
+    @property
+    def seq(self):
+        ''' The sequence number of the latest change. Zero if none. '''
+        return self._seq
+
+    @property
+    def first(self):
+        ''' The sequence number of the oldest retained change. '''
+        if self._changes:
+            return self._changes[0][0]
+        return self._seq + 1
+
+    def subscribe(self, callback, since=None):
+        ''' Register a callback(seq, op, id, fields). Use "since" to first
+        receive every retained change after that sequence number. False if
+        "since" is older than the retained changes. '''
+        if since is not None:
+            changes = self.changes(since)
+            if changes is False:
+                return False
+            for change in changes:
+                callback(*change)
+        if callback not in self._callbacks:
+            self._callbacks.append(callback)
+        return True
+
+    def unsubscribe(self, callback):
+        ''' Remove a callback. False if it was never registered. '''
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+            return True
+        return False
+
+    def changes(self, since=0):
+        ''' List every change after the "since" sequence number. False if "since"
+        is older than the retained changes - re-read the database, instead - or
+        newer than the latest change (as from some other feed.) '''
+        if since > self._seq:
+            return False
+        if since == self._seq:
+            return list()
+        if since < self.first - 1:
+            return False
+        return self._changes[since - self.first + 1:]
+
+    def publish(self, op, row=None):
+        ''' Number, record, and announce a change made to the rows. Returns the
+        change, else None when nothing changed. '''
+        fields = None
+        if op == 'clear':
+            self._shadow.clear()
+            key = None
+        elif op == 'delete':
+            key = row.id
+            self._shadow.pop(key, None)
+        else:
+            key = row.id
+            new = row._data
+            old = self._shadow.get(key)
+            if old is None or op != 'update':
+                fields = list(new)
+            else:
+                fields = [zkey for zkey in new if zkey not in old or
+                          (old[zkey] is not new[zkey] and old[zkey] != new[zkey])]
+                fields.extend(zkey for zkey in old if zkey not in new)
+                if not fields:
+                    return None
+            self._shadow[key] = dict(new)
+        self._seq += 1
+        change = (self._seq, op, key, fields)
+        self._changes.append(change)
+        if self._log:
+            self._log.append(list(change))
+        for callback in self._callbacks:
+            callback(*change)
+        if self._retain and len(self._changes) > self._retain * 2:
+            self.trim(self._seq - self._retain)
+        return change
+
+    def trim(self, upto):
+        ''' Forget the changes up to (and including) the "upto" sequence number.
+        The latest change is always retained. Returns the number forgotten.
+        (A LoggedRowArray drops them from its log upon its next checkpoint.) '''
+        upto = min(upto, self._seq - 1)
+        tally = max(0, upto - self.first + 1)
+        if not tally:
+            return 0
+        self._changes = self._changes[tally:]
+        if self._log:
+            self._log.rewrite(list(change) for change in self._changes)
+        return tally
+
+    def commit(self):
+        ''' Sync any pending log records now. '''
+        if self._shared:
+            self._rows.commit()
+        elif self._log:
+            self._log.commit()
+
+    def close(self):
+        ''' Detach from the rows, and close the log. '''
+        if self._rows._feed is self:
+            self._rows._feed = None
+        if self._log:
+            self._log.close()
+            self._log = None
+
+
+if __name__ == '__main__':
+    import tempfile
+    from ZipNotes.Row import RowOne
+    from ZipNotes.RowArray import RowArray
+    from ZipNotes.ZipBase import ZipArchiveBase
+    from ZipNotes.WriteLog import LoggedRowArray
+
+    db = RowArray()
+    old = db.create()
+    feed = ChangeFeed(db)
+    assert(feed.seq == 0 and feed.changes() == [])
+    heard = list()
+    feed.subscribe(lambda *change: heard.append(change))
+    row = db.create()
+    assert(feed.changes() == [(1, 'create', row.id, ['id', 'time', 'subject', 'data'])])
+    row.subject = "Changed"
+    row.set('color', 'blue')
+    assert(db.update(row))
+    assert(feed.changes(1) == [(2, 'update', row.id, ['subject', 'color'])])
+    assert(db.update(row))
+    assert(feed.seq == 2)  # Nothing changed.
+    old.data = "Changed"
+    assert(db.update(old))
+    assert(feed.changes(2) == [(3, 'update', old.id, ['data'])])
+    assert(db.update(RowOne()) == False)
+    zrow = RowOne()
+    assert(db.append(zrow))
+    assert(db.delete(row))
+    db.clear()
+    assert([change[1] for change in feed.changes()] == ['create', 'update', 'update', 'append', 'delete', 'clear'])
+    assert(heard == feed.changes())
+    # Changes are retained, and can be trimmed:
+    assert(feed.trim(4) == 4)
+    assert(feed.first == 5)
+    assert(feed.changes(3) == False)
+    assert(feed.changes() == False)
+    assert([change[0] for change in feed.changes(4)] == [5, 6])
+    assert(feed.subscribe(print, since=1) == False)
+    assert(feed.trim(99) == 1 and feed.first == 6)
+    feed.close()
+    db.create()
+    assert(feed.seq == 6)
+
+    with tempfile.TemporaryDirectory() as folder:
+        # A persisted feed survives a restart:
+        db = RowArray()
+        feed = ChangeFeed(db, os.path.join(folder, 'feed.log'), retain=10)
+        rows = [db.create() for ss in range(30)]
+        assert(feed.seq == 30 and feed.first > 10)
+        feed.close()
+        feed = ChangeFeed(db, os.path.join(folder, 'feed.log'))
+        assert(feed.seq == 30 and feed.changes(25)[0][0] == 26)
+        feed.close()
+        # A LoggedRowArray carries each change in the log record of its edit:
+        archive = ZipArchiveBase(os.path.join(folder, 'feed.zdb'))
+        db = LoggedRowArray(archive)
+        db.open()
+        try:
+            ChangeFeed(db, os.path.join(folder, 'other.log'))
+            raise Exception("Error: A LoggedRowArray logs its own changes.")
+        except ValueError:
+            pass
+        feed = ChangeFeed(db, retain=10)
+        rows = [db.create() for ss in range(30)]
+        for row in rows:
+            row.subject = "Updated"
+            assert(db.update(row))
+        assert(feed.seq == 60)
+        assert(feed.first > 40)
+        assert(db.checkpoint())   # Retained changes are kept in the log...
+        rows[1].subject = "Logged"
+        assert(db.update(rows[1]))
+        feed.close()
+        db.close()
+        db = LoggedRowArray(archive)
+        assert(db.open() == 1)    # ...but are never replayed as edits.
+        feed = ChangeFeed(db)
+        assert(feed.seq == 61 and feed.first <= 51)
+        seen = list()
+        assert(feed.subscribe(lambda *change: seen.append(change), since=55))
+        assert([change[0] for change in seen] == [56, 57, 58, 59, 60, 61])
+        rows[0].data = "Resumed"
+        assert(db.update(rows[0]))
+        assert(seen[-1] == (62, 'update', rows[0].id, ['data']))
+        # A crash keeps both an edit and its change - or neither:
+        db.commit()
+        feed.close()
+        db.close()
+        with open(archive.file + LoggedRowArray.LOG_TYPE, 'rb+') as fh:
+            fh.truncate(os.path.getsize(fh.name) - 1)
+        db = LoggedRowArray(archive)
+        db.open()
+        feed = ChangeFeed(db)
+        assert(feed.seq == 61)
+        assert(db.lookup(rows[0].id).data != "Resumed")
+        feed.close()
+        # Numbering resumes after a checkpoint made without a feed:
+        assert(db.checkpoint())
+        db.close()
+        db = LoggedRowArray(archive)
+        assert(db.open() == 0)
+        feed = ChangeFeed(db)
+        assert(feed.seq == 61)
+        assert(feed.changes(61) == [] and feed.changes(62) == False)
+        rows[0].data = "Resumed"
+        assert(db.update(rows[0]))
+        assert(feed.seq == 62)
+        feed.close()
+        db.close()
+    print("Testing Success")
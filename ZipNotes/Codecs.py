@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+
+# Mission: Opportunity to choose how an archived file is encoded. A codec is
+# a serializer, plus an optional pre-compressor, plus optional encryption.
+# The codec used is recorded with each archived file, so any archive remains
+# readable - no matter which codec is in use today.
+
+# Status: Testing Success
+# Date Created: 2026-10-19
+
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+import hashlib
+import json
+import struct
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    AESGCM = None
+
+
+def _varint(value, out):
+    ''' Append an unsigned LEB128 integer. '''
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _unvarint(data, pos):
+    ''' Read an unsigned LEB128 integer. Returns (value, next position). '''
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+class BinSerializer:
+
+    '''
+    A compact, msgpack-style, tagged binary encoding for None, bool, int, float,
+    str, bytes, list / tuple, and dict. Dictionary order is preserved. Integers
+    are zig-zag varints, so small numbers cost a byte or two.
+    '''
+
+    @staticmethod
+    def dumps(value):
+        out = bytearray()
+        BinSerializer._pack(value, out)
+        return bytes(out)
+
+    @staticmethod
+    def loads(data):
+        value, pos = BinSerializer._unpack(memoryview(data), 0)
+        if pos != len(data):
+            raise ValueError("Trailing data in binary payload.")
+        return value
+
+    @staticmethod
+    def _pack(value, out):
+        if value is None:
+            out.append(0x4E)                # N
+        elif value is True:
+            out.append(0x54)                # T
+        elif value is False:
+            out.append(0x46)                # F
+        elif isinstance(value, int):
+            out.append(0x69)                # i
+            _varint((value << 1) if value >= 0 else ((-value << 1) - 1), out)
+        elif isinstance(value, float):
+            out.append(0x66)                # f
+            out += struct.pack('>d', value)
+        elif isinstance(value, str):
+            data = value.encode('utf-8')
+            out.append(0x73)                # s
+            _varint(len(data), out)
+            out += data
+        elif isinstance(value, (bytes, bytearray)):
+            out.append(0x62)                # b
+            _varint(len(value), out)
+            out += value
+        elif isinstance(value, (list, tuple)):
+            out.append(0x6C)                # l
+            _varint(len(value), out)
+            for item in value:
+                BinSerializer._pack(item, out)
+        elif isinstance(value, dict):
+            out.append(0x64)                # d
+            _varint(len(value), out)
+            for key in value:
+                BinSerializer._pack(key, out)
+                BinSerializer._pack(value[key], out)
+        else:
+            raise TypeError("Unable to encode " + type(value).__name__)
+
+    @staticmethod
+    def _unpack(data, pos):
+        tag = data[pos]
+        pos += 1
+        if tag == 0x4E:
+            return None, pos
+        if tag == 0x54:
+            return True, pos
+        if tag == 0x46:
+            return False, pos
+        if tag == 0x69:
+            value, pos = _unvarint(data, pos)
+            return (value >> 1) if not value & 1 else -((value + 1) >> 1), pos
+        if tag == 0x66:
+            return struct.unpack_from('>d', data, pos)[0], pos + 8
+        if tag == 0x73:
+            size, pos = _unvarint(data, pos)
+            return str(data[pos:pos + size], 'utf-8'), pos + size
+        if tag == 0x62:
+            size, pos = _unvarint(data, pos)
+            return bytes(data[pos:pos + size]), pos + size
+        if tag == 0x6C:
+            size, pos = _unvarint(data, pos)
+            results = list()
+            for ss in range(size):
+                value, pos = BinSerializer._unpack(data, pos)
+                results.append(value)
+            return results, pos
+        if tag == 0x64:
+            size, pos = _unvarint(data, pos)
+            results = dict()
+            for ss in range(size):
+                key, pos = BinSerializer._unpack(data, pos)
+                results[key], pos = BinSerializer._unpack(data, pos)
+            return results, pos
+        raise ValueError("Unknown binary tag %d" % tag)
+
+
+# Serializers: name -> (encode(value) -> bytes, decode(bytes) -> value)
+SERIALIZERS = {
+    'text':  (lambda value: bytes(value, 'utf-8'), lambda data: str(data, 'utf-8')),
+    'bytes': (bytes, bytes),
+    'repr':  (lambda value: bytes(repr(value), 'utf-8'), lambda data: eval(str(data, 'utf-8'))),
+    'json':  (lambda value: bytes(json.dumps(value, separators=(',', ':')), 'utf-8'),
+              lambda data: json.loads(str(data, 'utf-8'))),
+    'bin':   (BinSerializer.dumps, BinSerializer.loads),
+    }
+
+
+class _Streamer:
+    ''' Adapt a compressor object to .update() / .flush(). '''
+
+    def __init__(self, zobj, begin=b''):
+        self._zobj = zobj
+        self._begin = begin
+
+    def update(self, data):
+        result = self._begin + self._zobj.compress(data)
+        self._begin = b''
+        return result
+
+    def flush(self):
+        return self._begin + self._zobj.flush()
+
+
+def _lz4_streamer():
+    zobj = lz4.frame.LZ4FrameCompressor()
+    return _Streamer(zobj, zobj.begin())
+
+
+# Compressors: name -> (compress(bytes), decompress(bytes), streamer()). Only those installed.
+COMPRESSORS = {
+    'zlib': (zlib.compress, zlib.decompress, lambda: _Streamer(zlib.compressobj())),
+    }
+if lz4:
+    COMPRESSORS['lz4'] = (lz4.frame.compress, lz4.frame.decompress, _lz4_streamer)
+if zstandard:
+    # Streamed frames omit the content size, so decompress as a stream, too:
+    COMPRESSORS['zstd'] = (lambda data: zstandard.ZstdCompressor().compress(data),
+                           lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data),
+                           lambda: _Streamer(zstandard.ZstdCompressor().compressobj()))
+
+
+class Cipher:
+
+    '''
+    Streaming, authenticated, encryption (AES-256-GCM) for archived files.
+    Payloads are sealed in CHUNK sized pieces, each using a nonce made of a
+    random per-file prefix, the chunk number, and a last-chunk flag - so that
+    chunks can be neither re-ordered, nor dropped. Any associated data ("aad",
+    as in the archived file's name) is authenticated with every chunk, so
+    sealed data cannot be moved to another name. Keys are derived (scrypt)
+    from the passphrase once per salt. Everything a Cipher writes uses the
+    one salt, so a session derives its key only once.
+    '''
+
+    NAME = 'aesgcm'
+    CHUNK = 64 * 1024
+    SALT = 16
+    PREFIX = 7
+    TAG = 16
+    SCRYPT = {'n': 2 ** 14, 'r': 8, 'p': 1}
+
+    def __init__(self, passphrase, salt=None):
+        if not AESGCM:
+            raise ValueError("Encryption requires the 'cryptography' package.")
+        if isinstance(passphrase, str):
+            passphrase = passphrase.encode('utf-8')
+        self._passphrase = passphrase
+        self._salt = salt if salt else os.urandom(Cipher.SALT)
+        self._keys = dict()
+        self._key(self._salt)
+
+    def _key(self, salt):
+        ''' The AEAD for a salt, deriving its key upon first use. '''
+        aead = self._keys.get(salt)
+        if aead is None:
+            key = hashlib.scrypt(self._passphrase, salt=salt, dklen=32,
+                                 maxmem=64 * 1024 * 1024, **Cipher.SCRYPT)
+            aead = self._keys[salt] = AESGCM(key)
+        return aead
+
+    @staticmethod
+    def Nonce(prefix, number, last):
+        return prefix + struct.pack('>IB', number, 1 if last else 0)
+
+    def encryptor(self, aad=b''):
+        ''' Return a streaming encryptor (.update(bytes) -> bytes, .flush() -> bytes.) '''
+        return _Encryptor(self._key(self._salt), self._salt, aad)
+
+    def decryptor(self, aad=b''):
+        ''' Return a streaming decryptor (.update(bytes) -> bytes, .flush() -> bytes.)
+        Tampered, truncated, or re-ordered data - or a different "aad" than was
+        used to encrypt - raise an exception. '''
+        return _Decryptor(self, aad)
+
+    def encrypt(self, data, aad=b''):
+        zobj = self.encryptor(aad)
+        return zobj.update(data) + zobj.flush()
+
+    def decrypt(self, data, aad=b''):
+        zobj = self.decryptor(aad)
+        return zobj.update(data) + zobj.flush()
+
+
+class _Encryptor:
+
+    def __init__(self, aead, salt, aad):
+        self._aead = aead
+        self._aad = bytes(aad)
+        self._prefix = os.urandom(Cipher.PREFIX)
+        self._header = salt + self._prefix
+        self._number = 0
+        self._buffer = bytearray()
+
+    def _seal(self, chunk, last):
+        nonce = Cipher.Nonce(self._prefix, self._number, last)
+        self._number += 1
+        return self._aead.encrypt(nonce, bytes(chunk), self._aad)
+
+    def update(self, data):
+        self._buffer += data
+        results = [self._header]
+        self._header = b''
+        pos = 0
+        while len(self._buffer) - pos > Cipher.CHUNK: # The last chunk waits for .flush()
+            results.append(self._seal(self._buffer[pos:pos + Cipher.CHUNK], False))
+            pos += Cipher.CHUNK
+        del self._buffer[:pos]
+        return b''.join(results)
+
+    def flush(self):
+        result = self._header + self._seal(self._buffer, True)
+        self._header = b''
+        self._buffer = bytearray()
+        return result
+
+
+class _Decryptor:
+
+    def __init__(self, cipher, aad):
+        self._cipher = cipher
+        self._aad = bytes(aad)
+        self._aead = None
+        self._prefix = None
+        self._number = 0
+        self._buffer = bytearray()
+
+    def _open(self, chunk, last):
+        nonce = Cipher.Nonce(self._prefix, self._number, last)
+        self._number += 1
+        return self._aead.decrypt(nonce, bytes(chunk), self._aad)
+
+    def update(self, data):
+        self._buffer += data
+        if self._aead is None:
+            size = Cipher.SALT + Cipher.PREFIX
+            if len(self._buffer) < size:
+                return b''
+            self._aead = self._cipher._key(bytes(self._buffer[:Cipher.SALT]))
+            self._prefix = bytes(self._buffer[Cipher.SALT:size])
+            del self._buffer[:size]
+        sealed = Cipher.CHUNK + Cipher.TAG
+        results = list()
+        pos = 0
+        while len(self._buffer) - pos > sealed:
+            results.append(self._open(self._buffer[pos:pos + sealed], False))
+            pos += sealed
+        del self._buffer[:pos]
+        return b''.join(results)
+
+    def flush(self):
+        if self._aead is None or len(self._buffer) < Cipher.TAG:
+            raise ValueError("Encrypted data is truncated.")
+        result = self._open(self._buffer, True)
+        self._buffer = bytearray()
+        return result
+
+
+class _StreamEncoder:
+
+    def __init__(self, codec, aad):
+        self._text = codec.serializer == 'text'
+        self._zobj = COMPRESSORS[codec.compressor][2]() if codec.compressor else None
+        self._crypt = codec.cipher.encryptor(aad) if codec.cipher else None
+
+    def update(self, chunk):
+        if self._text:
+            chunk = chunk.encode('utf-8')
+        if self._zobj:
+            chunk = self._zobj.update(chunk)
+        if self._crypt:
+            return self._crypt.update(chunk)
+        return bytes(chunk)
+
+    def flush(self):
+        result = self._zobj.flush() if self._zobj else b''
+        if self._crypt:
+            return self._crypt.update(result) + self._crypt.flush()
+        return result
+
+
+class Codec:
+
+    '''
+    A serializer for structured values (lists, dictionaries, etc.), plus an
+    optional pre-compressor, plus an optional Cipher. Strings always use 'text',
+    and bytes always use 'bytes', so binary payloads never take a str round-trip.
+    Use .For() to select the codec that will actually be used for a value, and
+    .tag() to record same.
+    '''
+
+    TAG_PREFIX = b'zdb:'
+
+    def __init__(self, serializer='repr', compressor=None, cipher=None):
+        if serializer not in SERIALIZERS:
+            raise ValueError("Unknown serializer: " + str(serializer))
+        if compressor == 'auto':
+            compressor = Codec.BestCompressor()
+        if compressor and compressor not in COMPRESSORS:
+            raise ValueError("Compressor is not installed: " + str(compressor))
+        if cipher is not None and not isinstance(cipher, Cipher):
+            raise ValueError("Not a Cipher: " + type(cipher).__name__)
+        self.serializer = serializer
+        self.compressor = compressor
+        self.cipher = cipher
+
+    @property
+    def name(self):
+        ''' The codec chain, as in "json+zlib", or "json+zlib+aesgcm". '''
+        result = self.serializer
+        if self.compressor:
+            result += '+' + self.compressor
+        if self.cipher:
+            result += '+' + Cipher.NAME
+        return result
+
+    def For(self, value):
+        ''' Return the codec to use for a value. '''
+        if isinstance(value, str):
+            serializer = 'text'
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            serializer = 'bytes'
+        else:
+            serializer = self.serializer
+        if serializer == self.serializer:
+            return self
+        return Codec(serializer, self.compressor, self.cipher)
+
+    def encode(self, value, aad=b''):
+        ''' Convert a value into archive-ready bytes. Any "aad" is authenticated,
+        but not stored - decoding must present the same. '''
+        data = SERIALIZERS[self.serializer][0](value)
+        if self.compressor:
+            data = COMPRESSORS[self.compressor][0](data)
+        if self.cipher:
+            data = self.cipher.encrypt(data, aad)
+        return data
+
+    def decode(self, data, aad=b''):
+        ''' Convert archived bytes back into a value. '''
+        if self.cipher:
+            data = self.cipher.decrypt(data, aad)
+        if self.compressor:
+            data = COMPRESSORS[self.compressor][1](data)
+        return SERIALIZERS[self.serializer][1](data)
+
+    def encoder(self, aad=b''):
+        ''' Return a streaming encoder (.update(chunk) -> bytes, .flush() -> bytes)
+        for 'text' or 'bytes' chunks. The concatenated result decodes just as if
+        the joined chunks had been encoded at once. '''
+        if self.serializer not in ('text', 'bytes'):
+            raise ValueError("Unable to stream a serializer: " + self.serializer)
+        return _StreamEncoder(self, aad)
+
+    def tag(self):
+        ''' The per-file record for this codec. Plain text needs none - just as
+        before codecs were introduced. '''
+        if self.name == 'text':
+            return b''
+        return Codec.TAG_PREFIX + bytes(self.name, 'utf-8')
+
+    @staticmethod
+    def FromTag(tag, cipher=None):
+        ''' Re-create the codec recorded for an archived file. Files without
+        a tag are plain text. Encrypted files require the cipher. '''
+        if not tag or not tag.startswith(Codec.TAG_PREFIX):
+            return Codec('text')
+        names = str(tag[len(Codec.TAG_PREFIX):], 'utf-8').split('+')
+        if names[-1] == Cipher.NAME:
+            if not cipher:
+                raise ValueError("An encrypted file requires a passphrase.")
+            names.pop()
+        else:
+            cipher = None
+        return Codec(names[0], names[1] if len(names) > 1 else None, cipher)
+
+    @staticmethod
+    def BestCompressor():
+        ''' The fastest installed pre-compressor. '''
+        for name in ('zstd', 'lz4', 'zlib'):
+            if name in COMPRESSORS:
+                return name
+
+
+if __name__ == '__main__':
+    from collections import OrderedDict
+    values = [None, True, False, 0, 1, -1, 63, -64, 2 ** 70, -2 ** 70, 3.25, -0.0,
+              "", "Test\n\r\noNe! ☃", b"", b"\x00\xff",
+              [1, [2, "three"]], (4, 5), {"a": 1, 2: [None]},
+              OrderedDict([('id', 'x'), ('time', 1234567890), ('data', 'y' * 500)])]
+    for value in values:
+        zback = BinSerializer.loads(BinSerializer.dumps(value))
+        if isinstance(value, tuple):
+            value = list(value)
+        assert(zback == value)
+    assert(len(BinSerializer.dumps(5)) == 2)
+    try:
+        BinSerializer.dumps(set())
+        raise Exception("Error: Sets are not encodable.")
+    except TypeError:
+        pass
+
+    rows = [{'id': 'x%d' % ss, 'time': ss, 'subject': 'Subject', 'data': 'z' * 100}
+            for ss in range(50)]
+    for serializer in ('repr', 'json', 'bin'):
+        for compressor in [None] + list(COMPRESSORS):
+            codec = Codec(serializer, compressor)
+            assert(codec.decode(codec.encode(rows)) == rows)
+            zcodec = Codec.FromTag(codec.tag())
+            assert(zcodec.name == codec.name)
+            assert(codec.For("str").name.startswith('text'))
+            assert(codec.For(b"bytes").name.startswith('bytes'))
+            assert(codec.For(b"\x00").decode(codec.For(b"\x00").encode(b"\x00")) == b"\x00")
+    for compressor in [None] + list(COMPRESSORS):
+        codec = Codec('text', compressor)
+        encoder = codec.encoder()
+        chunks = ["Chunk %d ☃\n" % ss for ss in range(1000)]
+        data = b''.join(encoder.update(chunk) for chunk in chunks) + encoder.flush()
+        assert(codec.decode(data) == ''.join(chunks))
+    try:
+        Codec('json').encoder()
+        raise Exception("Error: Structured serializers do not stream.")
+    except ValueError:
+        pass
+    assert(Codec.FromTag(b'').name == 'text')
+    assert(Codec('text').tag() == b'')
+    assert(Codec('json', 'auto').compressor == Codec.BestCompressor())
+    assert(len(Codec('bin', 'zlib').encode(rows)) < len(Codec('repr').encode(rows)))
+    try:
+        Codec('pickle')
+        raise Exception("Error: Unknown serializers must be rejected.")
+    except ValueError:
+        pass
+
+    if AESGCM:
+        from cryptography.exceptions import InvalidTag
+        cipher = Cipher("Sesame")
+        for size in (0, 1, Cipher.CHUNK - 1, Cipher.CHUNK, Cipher.CHUNK + 1, Cipher.CHUNK * 3):
+            data = os.urandom(size)
+            sealed = cipher.encrypt(data)
+            assert(len(sealed) == len(data) + Cipher.SALT + Cipher.PREFIX +
+                   Cipher.TAG * (1 + max(0, size - 1) // Cipher.CHUNK))
+            assert(cipher.decrypt(sealed) == data)
+            zobj = cipher.decryptor()
+            zback = b''.join(zobj.update(sealed[ss:ss + 1000]) for ss in range(0, len(sealed), 1000))
+            assert(zback + zobj.flush() == data)
+        sealed = cipher.encrypt(b"x" * (Cipher.CHUNK * 2))
+        for bad in (sealed[:-1], sealed[:-(Cipher.CHUNK + Cipher.TAG)],
+                    sealed[:30] + bytes([sealed[30] ^ 1]) + sealed[31:]):
+            try:
+                cipher.decrypt(bad)
+                raise Exception("Error: Tampering must be detected.")
+            except (ValueError, InvalidTag):
+                pass
+        # Keys are derived once per salt; any passphrase-sharing Cipher can read:
+        other = Cipher("Sesame")
+        assert(other.decrypt(sealed) == b"x" * (Cipher.CHUNK * 2))
+        assert(len(other._keys) == 2)
+        for compressor in [None] + list(COMPRESSORS):
+            codec = Codec('bin', compressor, cipher)
+            assert(codec.name.endswith('+' + Cipher.NAME))
+            assert(codec.decode(codec.encode(rows)) == rows)
+            assert(Codec.FromTag(codec.tag(), cipher).decode(codec.encode(rows)) == rows)
+            zcodec = codec.For("text")
+            encoder = zcodec.encoder()
+            chunks = ["Chunk %d ☃\n" % ss for ss in range(20000)]
+            data = b''.join(encoder.update(chunk) for chunk in chunks) + encoder.flush()
+            assert(zcodec.decode(data) == ''.join(chunks))
+        try:
+            Codec.FromTag(codec.tag())
+            raise Exception("Error: Encrypted files require a cipher.")
+        except ValueError:
+            pass
+        try:
+            Codec('bin', None, Cipher("Wrong")).decode(codec.encode(rows))
+            raise Exception("Error: A wrong passphrase must fail.")
+        except InvalidTag:
+            pass
+        # Data sealed for one name will not open as another:
+        sealed = codec.encode(rows, b"a.txt")
+        assert(codec.decode(sealed, b"a.txt") == rows)
+        encoder = zcodec.encoder(b"a.txt")
+        data = encoder.update("Streamed") + encoder.flush()
+        assert(zcodec.decode(data, b"a.txt") == "Streamed")
+        for zcodec, data in ((codec, sealed), (zcodec, data)):
+            try:
+                zcodec.decode(data, b"b.txt")
+                raise Exception("Error: The associated data must match.")
+            except InvalidTag:
+                pass
+    print("Testing Success")
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+# Mission: Opportunity to store an edited note as the difference from its
+# prior version, rather than as yet another full copy. Periodic keyframes
+# (full copies) keep the work of re-creating any version bounded.
+
+# Status: Testing Success
+# Date Created: 2026-10-19
+
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from difflib import SequenceMatcher
+
+from ZipNotes.Row import RowOne
+from ZipNotes.Codecs import BinSerializer
+
+class Delta:
+
+    '''
+    Text (or bytes) deltas are lists of operations: [start, length] copies
+    a slice of the prior version, while a str (or bytes) is inserted as-is.
+    Row deltas record the keys that were set, diffed, or removed.
+    '''
+
+    FINE_LIMIT = 4096 # Larger changed regions are not diffed any further.
+
+    @staticmethod
+    def Make(old, new):
+        ''' Create the operations that turn "old" into "new". '''
+        size = min(len(old), len(new))
+        head = Delta._Common(lambda zlen: old[:zlen] == new[:zlen], size)
+        tail = Delta._Common(lambda zlen: old[len(old) - zlen:] == new[len(new) - zlen:], size - head)
+        results = list()
+        if head:
+            results.append([0, head])
+        old_mid = old[head:len(old) - tail]
+        new_mid = new[head:len(new) - tail]
+        if new_mid:
+            if old_mid and len(old_mid) + len(new_mid) <= Delta.FINE_LIMIT:
+                matcher = SequenceMatcher(None, old_mid, new_mid, autojunk=False)
+                for op, i1, i2, j1, j2 in matcher.get_opcodes():
+                    if op == 'equal':
+                        results.append([head + i1, i2 - i1])
+                    elif j2 > j1:
+                        results.append(new_mid[j1:j2])
+            else:
+                results.append(new_mid)
+        if tail:
+            results.append([len(old) - tail, tail])
+        return results
+
+    @staticmethod
+    def _Common(same, most):
+        ''' The longest length (up to "most") for which same(length) holds. Slice
+        comparisons keep the search quick, even for very long notes. '''
+        low, high = 0, most
+        while low < high:
+            mid = (low + high + 1) // 2
+            if same(mid):
+                low = mid
+            else:
+                high = mid - 1
+        return low
+
+    @staticmethod
+    def Apply(old, ops):
+        ''' Re-create a version from its prior version, and operations. '''
+        parts = list()
+        for op in ops:
+            if isinstance(op, list):
+                parts.append(old[op[0]:op[0] + op[1]])
+            else:
+                parts.append(op)
+        return (b'' if isinstance(old, bytes) else '').join(parts)
+
+    @staticmethod
+    def MakeRow(old, new):
+        ''' Create the delta between two row dictionaries: {'set': {}, 'diff': {}, 'del': []} '''
+        result = {'set': dict(), 'diff': dict(), 'del': list()}
+        for key in new:
+            value = new[key]
+            if key in old and old[key] == value:
+                continue
+            prior = old.get(key)
+            if isinstance(value, (str, bytes)) and type(prior) == type(value) and \
+                    len(value) > 64:
+                result['diff'][key] = Delta.Make(prior, value)
+            else:
+                result['set'][key] = value
+        for key in old:
+            if key not in new:
+                result['del'].append(key)
+        return result
+
+    @staticmethod
+    def ApplyRow(old, delta):
+        ''' Re-create a row dictionary from its prior version, and delta. '''
+        result = dict(old)
+        for key in delta['del']:
+            result.pop(key, None)
+        for key in delta['diff']:
+            result[key] = Delta.Apply(old[key], delta['diff'][key])
+        result.update(delta['set'])
+        return result
+
+    @staticmethod
+    def IsEmpty(delta):
+        return not (delta['set'] or delta['diff'] or delta['del'])
+
+
+class RowHistory:
+
+    '''
+    Keep every saved version of a row in an archive (ZipArchiveBase), as
+    "history/<id>/<version>". Every KEYFRAME-th version is a full copy, the
+    others are row deltas. Re-creating a version reads one keyframe, plus
+    fewer than KEYFRAME deltas.
+    '''
+
+    HISTORY_DIR = "history/"
+    KEYFRAME = 16
+
+    def __init__(self, archive, keyframe=None):
+        self._archive = archive
+        self._keyframe = keyframe if keyframe else RowHistory.KEYFRAME
+        self._latest = dict()
+
+    def _name(self, key, version):
+        return "%s%s/%08d" % (RowHistory.HISTORY_DIR, key, version)
+
+    def versions(self, key):
+        ''' List the saved version numbers of a row, oldest first. '''
+        if isinstance(key, RowOne):
+            key = key.id
+        if not self._archive.exists():
+            return list()
+        prefix = RowHistory.HISTORY_DIR + key + '/'
+        results = set()
+        for name in self._archive.list():
+            if name.startswith(prefix):
+                results.add(int(name[len(prefix):]))
+        return sorted(results)
+
+    def record(self, row):
+        ''' Save a new version of a row. Returns the version number, else False
+        on error. Unchanged rows are not re-saved. '''
+        if not isinstance(row, RowOne):
+            return False
+        latest = self._latest.get(row.id)
+        if latest is None:
+            versions = self.versions(row.id)
+            if versions:
+                latest = (versions[-1], self._data(row.id, versions[-1]))
+        new = dict(row._data)
+        if latest is None:
+            version = 0
+            value = ['K', new]
+        else:
+            version = latest[0] + 1
+            delta = Delta.MakeRow(latest[1], new)
+            if Delta.IsEmpty(delta):
+                return latest[0]
+            if version % self._keyframe:
+                value = ['D', delta]
+            else:
+                value = ['K', new]
+        name = self._name(row.id, version)
+        if self._archive.exists():
+            bOkay = self._archive.archive_next(BinSerializer.dumps(value), name)
+        else:
+            bOkay = self._archive.archive_first(BinSerializer.dumps(value), name)
+        if not bOkay:
+            return False
+        self._latest[row.id] = (version, new)
+        return version
+
+    def _data(self, key, version):
+        first = version - (version % self._keyframe)
+        result = None
+        for zver in range(first, version + 1):
+            kind, value = BinSerializer.loads(self._archive.read_archive(self._name(key, zver)))
+            if kind == 'K':
+                result = value
+            else:
+                result = Delta.ApplyRow(result, value)
+        return result
+
+    def version(self, key, version):
+        ''' Re-create a saved version of a row. False if not found. '''
+        if isinstance(key, RowOne):
+            key = key.id
+        try:
+            return RowOne.FromString(self._data(key, version))
+        except Exception as ex:
+            return False
+
+
+if __name__ == '__main__':
+    cases = [("", ""), ("", "new"), ("old", ""), ("same", "same"),
+             ("The quick brown fox.", "The quick red fox!"),
+             ("a" * 10000 + "middle" + "b" * 10000, "a" * 10000 + "MIDDLE" + "b" * 10000),
+             ("x" * 5000, "y" * 5000),
+             (b"\x00\x01\x02\x03", b"\x00\x01\xff\x03")]
+    for old, new in cases:
+        assert(Delta.Apply(old, Delta.Make(old, new)) == new)
+    text = "Lorem ipsum dolor sit amet. " * 4000
+    edited = text[:50000] + "A new sentence. " + text[50000:]
+    ops = Delta.Make(text, edited)
+    assert(len(BinSerializer.dumps(ops)) < 100)
+    old = {'id': '1', 'time': 1, 'subject': 'S', 'data': text, 'gone': 1}
+    new = {'id': '1', 'time': 2, 'subject': 'S', 'data': edited, 'added': [1]}
+    delta = Delta.MakeRow(old, new)
+    assert(Delta.ApplyRow(old, delta) == new)
+    assert(len(BinSerializer.dumps(delta)) < 150)
+    assert(Delta.IsEmpty(Delta.MakeRow(new, new)))
+
+    import tempfile
+    from ZipNotes.ZipBase import ZipArchiveBase
+    with tempfile.TemporaryDirectory() as folder:
+        archive = ZipArchiveBase(os.path.join(folder, 'history.zdb'))
+        history = RowHistory(archive, keyframe=4)
+        row = RowOne()
+        row.data = text
+        expected = list()
+        for ss in range(10):
+            row.data = row.data[:ss * 100] + "Edit %d. " % ss + row.data[ss * 100:]
+            assert(history.record(row) == ss)
+            expected.append(row.data)
+        assert(history.record(row) == 9)
+        assert(history.versions(row) == list(range(10)))
+        assert(os.path.getsize(archive.file) < len(text) * 4)
+        history = RowHistory(archive, keyframe=4)
+        for ss in range(10):
+            assert(history.version(row.id, ss).data == expected[ss])
+        row.subject = "Changed"
+        assert(history.record(row) == 10)
+        assert(history.version(row, 10).subject == "Changed")
+        assert(history.version(row, 99) == False)
+        assert(archive.row_files() == [])
+    print("Testing Success")
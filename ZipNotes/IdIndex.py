@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+
+# Mission: Opportunity to answer "which archive holds this id?" without
+# loading any rows. Each archive carries a Bloom filter for fast negative
+# answers, and a sorted, sparsely indexed, id-to-file table for the rest.
+
+# Status: Testing Success
+# Date Created: 2026-10-19
+
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+import hashlib
+import math
+import struct
+from bisect import bisect_left, bisect_right
+from zipfile import ZipFile
+
+from ZipNotes.Row import RowOne
+from ZipNotes.RowArray import RowArray
+from ZipNotes.ZipBase import ZipArchiveBase
+from ZipNotes.Schema import FieldSchema
+
+class BloomFilter:
+
+    '''
+    A classic Bloom filter over strings. Never a false negative - but expect
+    false positives at about the requested rate.
+    '''
+
+    HEADER = struct.Struct('>II')
+
+    def __init__(self, bits, hashes, data=None):
+        self.bits = max(8, bits)
+        self.hashes = max(1, hashes)
+        self._data = bytearray(data) if data else bytearray((self.bits + 7) // 8)
+
+    @staticmethod
+    def Create(count, rate=0.01):
+        ''' Size a filter for "count" items at a false-positive "rate". '''
+        count = max(1, count)
+        bits = int(math.ceil(-count * math.log(rate) / (math.log(2) ** 2)))
+        return BloomFilter(bits, int(round(bits / count * math.log(2))))
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        one, two = struct.unpack('>QQ', digest)
+        for ss in range(self.hashes):
+            yield (one + ss * two) % self.bits
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._data[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        for pos in self._positions(key):
+            if not self._data[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def ToBytes(self):
+        return BloomFilter.HEADER.pack(self.bits, self.hashes) + bytes(self._data)
+
+    @staticmethod
+    def FromBytes(data):
+        bits, hashes = BloomFilter.HEADER.unpack_from(data, 0)
+        return BloomFilter(bits, hashes, data[BloomFilter.HEADER.size:])
+
+
+class IdIndex:
+
+    '''
+    The id index for an archive (ZipArchiveBase) is kept in three archived files:
+    a Bloom filter ("_index/bloom"), a table of fixed-width (id, file number)
+    records sorted by id ("_index/ids"), and the sparse index to that table:
+    every STRIDE-th id, the record width, and the list of files
+    ("_index/sparse"). A lookup reads but one STRIDE of records. Use .build()
+    after archiving rows to (re-)create the index. The sparse index also
+    records the (name, crc, size) of each indexed file: once any row file
+    changes, the archive counts as not indexed until re-built. When the
+    archive has a cipher, all three files are encrypted with it: the id table
+    is then read whole (once per change to the archive), rather than in strides.
+    '''
+
+    BLOOM = "_index/bloom"
+    IDS = "_index/ids"
+    SPARSE = "_index/sparse"
+    STRIDE = 64
+
+    def __init__(self, archive):
+        self._archive = archive
+        self._stamp = None
+        self._bloom = None
+        self._sparse = None
+        self._table = None
+
+    @property
+    def archive(self):
+        ''' Query the archive. '''
+        return self._archive
+
+    def build(self, rate=0.01):
+        ''' Index every active row in the archive - typed RowArrays (see
+        Schema.FieldSchema) included. Returns the number of ids indexed, else
+        False should any row file be unreadable. '''
+        sources = IdIndex.Sources(self._archive)
+        files = [source[0] for source in sources]
+        pairs = dict()
+        for number, name in enumerate(files):
+            rows = FieldSchema.ReadRows(self._archive, name)
+            if rows is False:
+                return False # Never index what would then be a false negative.
+            for key in rows._db:
+                if rows._db[key]:
+                    pairs[str(key)] = number
+        keys = sorted(pairs)
+        bloom = BloomFilter.Create(len(keys), rate)
+        width = 1
+        for key in keys:
+            bloom.add(key)
+            width = max(width, len(key.encode('utf-8')))
+        table = bytearray()
+        for key in keys:
+            table += key.encode('utf-8').ljust(width, b'\x00') + struct.pack('>H', pairs[key])
+        sparse = {'width': width, 'count': len(keys), 'stride': IdIndex.STRIDE,
+                  'files': files, 'keys': keys[::IdIndex.STRIDE],
+                  'sources': sources}
+        # Plain (un-compressed) bytes, so the table can be read in strides:
+        writer = self._archive if self._archive.codec.cipher else ZipArchiveBase(self._archive.file)
+        for name, value in ((IdIndex.BLOOM, bloom.ToBytes()),
+                            (IdIndex.IDS, bytes(table)),
+                            (IdIndex.SPARSE, repr(sparse))):
+            if not writer.archive_next(value, name):
+                return False
+        self._stamp = None
+        return len(keys)
+
+    def _load(self):
+        ''' (Re-)read the filter, and sparse index, whenever the archive changes. '''
+        stat = os.stat(self._archive.file)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        if stamp == self._stamp:
+            return self._bloom is not None
+        self._stamp = stamp
+        self._bloom = self._sparse = self._table = None
+        data = self._archive.read_archive(IdIndex.BLOOM)
+        sparse = self._archive.read_archive(IdIndex.SPARSE)
+        if not isinstance(data, bytes) or not sparse:
+            return False
+        sparse = eval(sparse)
+        if sparse.get('sources') != IdIndex.Sources(self._archive):
+            return False # Rows were archived since the index was built.
+        self._bloom = BloomFilter.FromBytes(data)
+        self._sparse = sparse
+        return True
+
+    @staticmethod
+    def Sources(archive):
+        ''' The (name, crc, size) of the latest copy of each row file. '''
+        latest = dict()
+        with ZipFile(archive.file) as zZip:
+            for info in zZip.infolist():
+                if not ZipArchiveBase.IsSystem(info.filename):
+                    latest[info.filename] = (info.filename, info.CRC, info.file_size)
+        return list(latest.values())
+
+    def might_contain(self, key):
+        ''' False when the id is certainly not in the archive. True when it
+        might be - or when the archive has not been indexed since it last changed. '''
+        if isinstance(key, RowOne):
+            key = key.id
+        if not self._load():
+            return True
+        return key in self._bloom
+
+    def locate(self, key):
+        ''' Return the name of the archived file holding an id. None if not found,
+        False if the archive has not been indexed (since its rows last changed.) '''
+        if isinstance(key, RowOne):
+            key = key.id
+        if not self._load():
+            return False
+        if key not in self._bloom:
+            return None
+        sparse = self._sparse
+        block = bisect_right(sparse['keys'], key) - 1
+        if block < 0:
+            return None
+        size = sparse['width'] + 2
+        first = block * sparse['stride']
+        count = min(sparse['stride'], sparse['count'] - first)
+        if self._archive.codec.cipher:
+            if self._table is None:
+                self._table = self._archive.read_archive(IdIndex.IDS)
+            if not isinstance(self._table, bytes):
+                self._table = None
+                return False
+            data = self._table[first * size:(first + count) * size]
+        else:
+            with ZipFile(self._archive.file) as zZip:
+                with zZip.open(IdIndex.IDS) as fh:
+                    fh.seek(first * size)
+                    data = fh.read(count * size)
+        want = key.encode('utf-8').ljust(sparse['width'], b'\x00')
+        keys = [data[ss * size:ss * size + sparse['width']] for ss in range(count)]
+        ss = bisect_left(keys, want)
+        if ss < count and keys[ss] == want:
+            return sparse['files'][struct.unpack_from('>H', data, ss * size + sparse['width'])[0]]
+        return None
+
+    def scan(self, key):
+        ''' Search the row files themselves, rather than the index - as when
+        the index is stale. Returns the name of the file holding an id, else None. '''
+        if isinstance(key, RowOne):
+            key = key.id
+        found = None
+        for name, crc, size in IdIndex.Sources(self._archive):
+            rows = FieldSchema.ReadRows(self._archive, name)
+            if rows is not False and rows._db.get(key):
+                found = name # As with .build(), the last file archived wins.
+        return found
+
+    @staticmethod
+    def Locate(archives, key):
+        ''' Search a list of IdIndexes for an id. Returns the (index, file name)
+        of the first match, else None. Archives whose index is stale are scanned. '''
+        for index in archives:
+            if not index.might_contain(key):
+                continue
+            name = index.locate(key)
+            if name is False:
+                name = index.scan(key)
+            if name:
+                return index, name
+        return None
+
+
+if __name__ == '__main__':
+    import tempfile
+    import time
+    bloom = BloomFilter.Create(1000, 0.01)
+    for ss in range(1000):
+        bloom.add("key%d" % ss)
+    for ss in range(1000):
+        assert("key%d" % ss in bloom)
+    false = sum(1 for ss in range(10000) if "nope%d" % ss in bloom)
+    assert(false < 300)
+    bloom = BloomFilter.FromBytes(bloom.ToBytes())
+    assert("key5" in bloom)
+
+    with tempfile.TemporaryDirectory() as folder:
+        indexes = list()
+        ids = list()
+        for number in range(3):
+            archive = ZipArchiveBase(os.path.join(folder, 'idx%d.zdb' % number))
+            for part in range(2):
+                db = RowArray()
+                for ss in range(150):
+                    ids.append((db.create().id, number, "part%d" % part))
+                if part:
+                    assert(archive.archive_next(RowArray.ToString(db), "part%d" % part))
+                else:
+                    assert(archive.archive_first(RowArray.ToString(db), "part%d" % part))
+            index = IdIndex(archive)
+            assert(index.locate(ids[-1][0]) == False)
+            assert(index.build() == 300)
+            indexes.append(index)
+        for key, number, name in ids:
+            assert(indexes[number].locate(key) == name)
+            assert(IdIndex.Locate(indexes, key) == (indexes[number], name))
+        assert(IdIndex.Locate(indexes, "missing") is None)
+        assert(indexes[0].locate("") is None)
+        assert(indexes[1].locate(RowOne.FromString({'id': ids[400][0]})) == ids[400][2])
+        assert(indexes[0].locate("~" * 40) is None)
+        # Index files are never mistaken for rows:
+        assert(indexes[0].archive.row_files() == ["part0", "part1"])
+        # New rows make the index stale, rather than wrong:
+        db = RowArray()
+        added = db.create().id
+        assert(IdIndex.Locate(indexes, added) is None)
+        assert(indexes[2].archive.archive_next(RowArray.ToString(db), "part2"))
+        assert(indexes[2].might_contain(added))
+        assert(indexes[2].locate(added) == False)
+        assert(indexes[2].locate(ids[-1][0]) == False)
+        assert(IdIndex.Locate(indexes, added) == (indexes[2], "part2"))
+        assert(IdIndex.Locate(indexes, ids[-1][0]) == (indexes[2], "part1"))
+        assert(IdIndex.Locate(indexes, "missing") is None)
+        assert(indexes[2].build() == 301)
+        assert(IdIndex.Locate(indexes, added) == (indexes[2], "part2"))
+        assert(indexes[2].archive.archive_next("Not a RowArray", "notes.txt"))
+        assert(indexes[2].build() == False)
+        assert(indexes[2].locate(added) == False)
+        assert(IdIndex.Locate(indexes, added) == (indexes[2], "part2"))
+        # Encrypted archives keep their index encrypted, as well:
+        from ZipNotes.Codecs import AESGCM, Codec, Cipher
+        if AESGCM:
+            archive = ZipArchiveBase(os.path.join(folder, 'sealed.zdb'), Codec(cipher=Cipher("Sesame")))
+            db = RowArray()
+            sealed = [db.create().id for ss in range(200)]
+            assert(archive.archive_first(RowArray.ToString(db), "part0"))
+            index = IdIndex(archive)
+            assert(index.build() == 200)
+            with open(archive.file, 'rb') as fh:
+                zdata = fh.read()
+            assert(not any(bytes(key, 'utf-8') in zdata for key in sealed))
+            assert(all(index.locate(key) == "part0" for key in sealed))
+            assert(index.locate("missing") is None)
+            assert(IdIndex(ZipArchiveBase(archive.file)).locate(sealed[0]) == False)
+        # Negative lookups take microseconds (once indexed - a stale archive is scanned):
+        start = time.perf_counter()
+        for ss in range(1000):
+            IdIndex.Locate(indexes[:2], "missing%d" % ss)
+        assert((time.perf_counter() - start) / 1000 < 0.001)
+    print("Testing Success")
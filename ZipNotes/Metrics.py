@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+# Mission: Opportunity to see where the time goes. Storage operations report
+# timers, byte counters, and cache hits into an opt-in, in-process, registry.
+
+# Status: Testing Success
+# Date Created: 2026-10-19
+
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+import time
+from collections import OrderedDict
+
+class _NullTimer:
+    ''' The do-nothing timer handed out whenever the registry is disabled. '''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class _Timer:
+    ''' Time a block, then report same to the registry. '''
+
+    def __init__(self, registry, name):
+        self._registry = registry
+        self._name = name
+        self._start = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *args):
+        self._registry.record(self._name, time.perf_counter_ns() - self._start)
+        return False
+
+
+class MetricsRegistry:
+
+    '''
+    Timers (count, total & max nanoseconds), counters, and hit / miss tallies.
+    Nothing is recorded until .enable() is called. Callbacks registered via
+    .subscribe() receive each (kind, name, value) as it is reported.
+    '''
+
+    _NULL = _NullTimer()
+
+    def __init__(self):
+        self.enabled = False
+        self._timers = OrderedDict()
+        self._counters = OrderedDict()
+        self._callbacks = list()
+
+    def enable(self):
+        ''' Start recording. '''
+        self.enabled = True
+
+    def disable(self):
+        ''' Stop recording. Collected values are preserved. '''
+        self.enabled = False
+
+    def reset(self):
+        ''' Remove all collected values. Callbacks are preserved. '''
+        self._timers.clear()
+        self._counters.clear()
+
+    def subscribe(self, callback):
+        ''' Register a callback(kind, name, value). Kind is 'timer' or 'counter'. '''
+        if callback not in self._callbacks:
+            self._callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        ''' Remove a callback. False if it was never registered. '''
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+            return True
+        return False
+
+    def timer(self, name):
+        ''' Return a context manager timing a block under "name". '''
+        if not self.enabled:
+            return MetricsRegistry._NULL
+        return _Timer(self, name)
+
+    def record(self, name, nanos):
+        ''' Add a timing (nanoseconds) to a named timer. '''
+        if not self.enabled:
+            return
+        value = self._timers.get(name)
+        if value is None:
+            value = self._timers[name] = [0, 0, 0]
+        value[0] += 1
+        value[1] += nanos
+        if nanos > value[2]:
+            value[2] = nanos
+        for callback in self._callbacks:
+            callback('timer', name, nanos)
+
+    def add(self, name, amount=1):
+        ''' Add an amount to a named counter. '''
+        if not self.enabled:
+            return
+        self._counters[name] = self._counters.get(name, 0) + amount
+        for callback in self._callbacks:
+            callback('counter', name, amount)
+
+    def hit(self, name, found):
+        ''' Tally a cache (or lookup) hit when found, else a miss. '''
+        if not self.enabled:
+            return
+        self.add(name + ('.hit' if found else '.miss'))
+
+    def counter(self, name):
+        ''' Query a counter. Zero if never reported. '''
+        return self._counters.get(name, 0)
+
+    def hit_rate(self, name):
+        ''' The hit ratio (0.0 - 1.0) for a name. None if never reported. '''
+        hits = self.counter(name + '.hit')
+        total = hits + self.counter(name + '.miss')
+        if not total:
+            return None
+        return hits / total
+
+    def snapshot(self):
+        ''' Scrape everything collected so far into a plain dictionary. '''
+        result = OrderedDict()
+        for name in self._timers:
+            count, total, most = self._timers[name]
+            result[name] = {'count': count, 'total_ns': total,
+                            'mean_ns': total // count, 'max_ns': most}
+        for name in self._counters:
+            result[name] = self._counters[name]
+        return result
+
+
+REGISTRY = MetricsRegistry()
+
+
+if __name__ == '__main__':
+    zreg = MetricsRegistry()
+    assert(zreg.timer('off') is MetricsRegistry._NULL)
+    zreg.add('off')
+    assert(zreg.counter('off') == 0)
+    assert(len(zreg.snapshot()) == 0)
+    seen = list()
+    zreg.subscribe(lambda kind, name, value: seen.append((kind, name)))
+    zreg.enable()
+    with zreg.timer('zip.read'):
+        time.sleep(0.001)
+    with zreg.timer('zip.read'):
+        pass
+    zreg.add('zip.bytes', 100)
+    zreg.add('zip.bytes', 20)
+    zreg.hit('rows.lookup', True)
+    zreg.hit('rows.lookup', True)
+    zreg.hit('rows.lookup', False)
+    snap = zreg.snapshot()
+    assert(snap['zip.read']['count'] == 2)
+    assert(snap['zip.read']['max_ns'] >= 1000000)
+    assert(snap['zip.bytes'] == 120)
+    assert(abs(zreg.hit_rate('rows.lookup') - 2 / 3) < 0.0001)
+    assert(zreg.hit_rate('never') is None)
+    assert(('timer', 'zip.read') in seen)
+    assert(('counter', 'rows.lookup.miss') in seen)
+    zreg.disable()
+    zreg.add('zip.bytes', 1)
+    assert(zreg.counter('zip.bytes') == 120)
+    zreg.reset()
+    assert(len(zreg.snapshot()) == 0)
+
+    # Storage operations report into the shared registry:
+    from ZipNotes.Metrics import REGISTRY
+    from ZipNotes.RowArray import RowArray
+    from ZipNotes.ZipBase import ZipArchiveBase
+    import tempfile
+    REGISTRY.enable()
+    with tempfile.TemporaryDirectory() as folder:
+        db = RowArray()
+        row = db.create()
+        archive = ZipArchiveBase(os.path.join(folder, 'metrics.zdb'))
+        assert(archive.archive_first(RowArray.ToString(db), 'ZibDB.txt'))
+        db2 = RowArray.FromString(archive.read_archive('ZibDB.txt'))
+        assert(db2.lookup(row.id))
+        assert(db2.lookup('missing') is None)
+    snap = REGISTRY.snapshot()
+    for name in ('zip.open', 'zip.read', 'zip.decode', 'zip.write', 'rows.parse'):
+        assert(snap[name]['count'] == 1)
+    assert(snap['zip.read.uncompressed'] > 0)
+    assert(snap['zip.read.compressed'] > 0)
+    assert(snap['zip.write.uncompressed'] == snap['zip.read.uncompressed'])
+    assert(REGISTRY.hit_rate('rows.lookup') == 0.5)
+    REGISTRY.disable()
+    print("Testing Success")
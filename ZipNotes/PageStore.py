@@ -0,0 +1,745 @@
+#!/usr/bin/env python3
+
+# Mission: Opportunity to update a single row without re-creating an entire
+# archive. Rows live in a B-tree of fixed-size pages within a single file.
+# The .zdb ZIP format remains our portable snapshot, via export / import.
+
+# Status: Testing Success
+# Date Created: 2026-10-19
+
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+import struct
+from bisect import bisect_left, bisect_right
+
+from ZipNotes.Row import RowOne
+from ZipNotes.RowArray import RowArray
+from ZipNotes.ZipBase import ZipArchiveBase
+from ZipNotes.Codecs import Codec, BinSerializer
+from ZipNotes.WriteLog import WriteAheadLog
+
+class PageFile:
+
+    '''
+    A file of fixed-size pages. Page zero is the header: magic, page size,
+    page count, B-tree root, free-list head, and key count. Released pages
+    are kept on a free list for re-use.
+
+    Writes are grouped into transactions. A .commit() logs every page of the
+    transaction to a write-ahead journal; pages reach the file itself only at
+    .checkpoint(), after the journal has been synced. Committed transactions
+    are replayed from the journal upon open, so a crash never leaves a
+    partial update (such as half of a split) in the page file.
+    '''
+
+    MAGIC = b'ZDBPAGE1'
+    HEADER = struct.Struct('>8sIIIII')
+    PAGE_SIZE = 4096
+    FREE = 4
+    JOURNAL = '-journal'
+    JOURNAL_BYTES = 4 * 1024 * 1024
+
+    def __init__(self, file, page_size=None):
+        self._file = file
+        self._txn = dict()
+        self._cache = dict()
+        self._log = WriteAheadLog(file + PageFile.JOURNAL)
+        if os.path.exists(file):
+            self._fh = open(file, 'r+b')
+            self._recover()
+            magic, self.page_size, self.page_count, self.root, self.free_head, \
+                self.key_count = PageFile.HEADER.unpack(self._fh.read(PageFile.HEADER.size))
+            if magic != PageFile.MAGIC:
+                self._fh.close()
+                self._log.close()
+                os.unlink(self._log.file)
+                raise ValueError("Not a page file: " + file)
+        else:
+            self._log.truncate()  # A journal without its page file is stale.
+            self._fh = open(file, 'w+b')
+            self.page_size = page_size if page_size else PageFile.PAGE_SIZE
+            self.page_count = 1
+            self.root = 0
+            self.free_head = 0
+            self.key_count = 0
+            self.write_header()
+            self.commit()
+
+    @property
+    def file(self):
+        ''' Query the page file-name. '''
+        return self._file
+
+    def _recover(self):
+        ''' Re-apply every committed transaction left in the journal. '''
+        bDirty = False
+        for page_size, pages in self._log.records():
+            for page, data in pages:
+                self._fh.seek(page * page_size)
+                self._fh.write(data)
+                bDirty = True
+        if bDirty:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._log.truncate()
+        self._fh.seek(0)
+
+    def write_header(self):
+        ''' Save the header page. '''
+        self.write(0, PageFile.HEADER.pack(PageFile.MAGIC, self.page_size, self.page_count,
+                                           self.root, self.free_head, self.key_count))
+
+    def read(self, page):
+        ''' Read a page, as of the latest write. '''
+        if page in self._txn:
+            return self._txn[page]
+        if page in self._cache:
+            return self._cache[page]
+        self._fh.seek(page * self.page_size)
+        return self._fh.read(self.page_size)
+
+    def write(self, page, data):
+        ''' Write a page, as part of the current transaction. Data shorter
+        than a page is zero-padded. '''
+        if len(data) > self.page_size:
+            raise ValueError("Page overflow: %d bytes" % len(data))
+        self._txn[page] = data + bytes(self.page_size - len(data))
+
+    def commit(self):
+        ''' Journal every page written since the last commit, as one record. '''
+        if not self._txn:
+            return
+        self._log.append([self.page_size, [[page, data] for page, data in self._txn.items()]])
+        self._cache.update(self._txn)
+        self._txn.clear()
+        if self._log.size() >= PageFile.JOURNAL_BYTES:
+            self.checkpoint()
+
+    def rollback(self):
+        ''' Discard every page written since the last commit. '''
+        self._txn.clear()
+        magic, self.page_size, self.page_count, self.root, self.free_head, \
+            self.key_count = PageFile.HEADER.unpack_from(self.read(0))
+
+    def checkpoint(self):
+        ''' Copy the journaled pages into the page file, then empty the journal. '''
+        self._log.commit()
+        if self._cache:
+            for page in sorted(self._cache):
+                self._fh.seek(page * self.page_size)
+                self._fh.write(self._cache[page])
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._log.truncate()
+            self._cache.clear()
+
+    def allocate(self):
+        ''' Return a page number to use, preferring the free list. '''
+        if self.free_head:
+            page = self.free_head
+            self.free_head = struct.unpack_from('>I', self.read(page), 1)[0]
+        else:
+            page = self.page_count
+            self.page_count += 1
+        self.write_header()
+        return page
+
+    def release(self, page):
+        ''' Put a page on the free list. '''
+        self.write(page, struct.pack('>BI', PageFile.FREE, self.free_head))
+        self.free_head = page
+        self.write_header()
+
+    def sync(self):
+        ''' Flush all committed writes to the storage device. '''
+        self.checkpoint()
+
+    def close(self):
+        if self._fh:
+            self.commit()
+            self.checkpoint()
+            self._log.close()
+            os.unlink(self._log.file)
+            self._fh.close()
+            self._fh = None
+
+
+class BTree:
+
+    '''
+    A B+tree of bytes keys and bytes values, one node per page. Leaves are
+    linked for in-order iteration. Large values spill into a chain of overflow
+    pages. Deleted entries are removed from their leaf, without re-balancing.
+    '''
+
+    LEAF = 1
+    BRANCH = 2
+    OVERFLOW = 3
+    NODE = struct.Struct('>BHI')
+    MAX_KEY = 256
+
+    def __init__(self, pages):
+        self._pages = pages
+        self._inline = pages.page_size // 8
+        if not pages.root:
+            pages.root = pages.allocate()
+            self._write_leaf(pages.root, [], [], 0)
+            pages.write_header()
+            pages.commit()
+
+    def __len__(self):
+        return self._pages.key_count
+
+    # Node (de)serialization:
+
+    def _read_node(self, page):
+        data = self._pages.read(page)
+        kind, count, extra = BTree.NODE.unpack_from(data, 0)
+        pos = BTree.NODE.size
+        keys = list()
+        values = list()
+        for ss in range(count):
+            klen = struct.unpack_from('>H', data, pos)[0]
+            pos += 2
+            keys.append(bytes(data[pos:pos + klen]))
+            pos += klen
+            if kind == BTree.BRANCH:
+                values.append(struct.unpack_from('>I', data, pos)[0])
+                pos += 4
+            elif data[pos] == 0:
+                vlen = struct.unpack_from('>H', data, pos + 1)[0]
+                values.append((None, bytes(data[pos + 3:pos + 3 + vlen])))
+                pos += 3 + vlen
+            else:
+                values.append(struct.unpack_from('>II', data, pos + 1))
+                pos += 9
+        return kind, keys, values, extra
+
+    @staticmethod
+    def _leaf_size(keys, values):
+        size = BTree.NODE.size
+        for key, value in zip(keys, values):
+            size += 2 + len(key) + (3 + len(value[1]) if value[0] is None else 9)
+        return size
+
+    @staticmethod
+    def _branch_size(keys):
+        return BTree.NODE.size + sum(6 + len(key) for key in keys)
+
+    def _write_leaf(self, page, keys, values, next_leaf):
+        out = bytearray(BTree.NODE.pack(BTree.LEAF, len(keys), next_leaf))
+        for key, value in zip(keys, values):
+            out += struct.pack('>H', len(key)) + key
+            if value[0] is None:
+                out += struct.pack('>BH', 0, len(value[1])) + value[1]
+            else:
+                out += struct.pack('>BII', 1, value[0], value[1])
+        self._pages.write(page, bytes(out))
+
+    def _write_branch(self, page, keys, children):
+        ''' Branch keys[i] separates children[i] from children[i + 1]. The
+        left-most child is kept in the node header. '''
+        out = bytearray(BTree.NODE.pack(BTree.BRANCH, len(keys), children[0]))
+        for key, child in zip(keys, children[1:]):
+            out += struct.pack('>H', len(key)) + key + struct.pack('>I', child)
+        self._pages.write(page, bytes(out))
+
+    # Values:
+
+    def _store(self, value):
+        ''' Store a value inline, else in an overflow chain: (total, first page.) '''
+        if len(value) <= self._inline:
+            return (None, value)
+        room = self._pages.page_size - 7
+        pages = [self._pages.allocate() for ss in range(0, len(value), room)]
+        for ss, page in enumerate(pages):
+            chunk = value[ss * room:(ss + 1) * room]
+            znext = pages[ss + 1] if ss + 1 < len(pages) else 0
+            self._pages.write(page, struct.pack('>BIH', BTree.OVERFLOW, znext, len(chunk)) + chunk)
+        return (len(value), pages[0])
+
+    def _load(self, value):
+        if value[0] is None:
+            return value[1]
+        out = bytearray()
+        page = value[1]
+        while page:
+            data = self._pages.read(page)
+            kind, page, size = struct.unpack_from('>BIH', data, 0)
+            out += data[7:7 + size]
+        return bytes(out)
+
+    def _discard(self, value):
+        ''' Release any overflow pages used by a value. '''
+        if value[0] is None:
+            return
+        page = value[1]
+        while page:
+            znext = struct.unpack_from('>I', self._pages.read(page), 1)[0]
+            self._pages.release(page)
+            page = znext
+
+    # Operations:
+
+    def _leaf_for(self, key):
+        ''' Return the page of the leaf that holds (or would hold) a key. '''
+        page = self._pages.root
+        while True:
+            kind, keys, values, extra = self._read_node(page)
+            if kind == BTree.LEAF:
+                return page, keys, values, extra
+            children = [extra] + values
+            page = children[bisect_right(keys, key)]
+
+    def get(self, key, default=None):
+        ''' Retrieve the value for a key, else the default. '''
+        page, keys, values, extra = self._leaf_for(key)
+        ss = bisect_left(keys, key)
+        if ss < len(keys) and keys[ss] == key:
+            return self._load(values[ss])
+        return default
+
+    def __contains__(self, key):
+        page, keys, values, extra = self._leaf_for(key)
+        ss = bisect_left(keys, key)
+        return ss < len(keys) and keys[ss] == key
+
+    def put(self, key, value):
+        ''' Insert, or replace, the value for a key. '''
+        if len(key) > BTree.MAX_KEY:
+            raise ValueError("Key is too long: %d bytes" % len(key))
+        try:
+            split = self._insert(self._pages.root, key, value)
+            if split:
+                root = self._pages.allocate()
+                self._write_branch(root, [split[0]], [self._pages.root, split[1]])
+                self._pages.root = root
+            self._pages.write_header()
+        except Exception:
+            self._pages.rollback()
+            raise
+        self._pages.commit()
+
+    def _insert(self, page, key, value):
+        ''' Returns the (separator key, new right page) whenever a node splits. '''
+        kind, keys, values, extra = self._read_node(page)
+        if kind == BTree.BRANCH:
+            children = [extra] + values
+            ss = bisect_right(keys, key)
+            split = self._insert(children[ss], key, value)
+            if not split:
+                return None
+            keys.insert(ss, split[0])
+            children.insert(ss + 1, split[1])
+            if BTree._branch_size(keys) <= self._pages.page_size:
+                self._write_branch(page, keys, children)
+                return None
+            mid = len(keys) // 2
+            right = self._pages.allocate()
+            self._write_branch(page, keys[:mid], children[:mid + 1])
+            self._write_branch(right, keys[mid + 1:], children[mid + 1:])
+            return keys[mid], right
+        ss = bisect_left(keys, key)
+        if ss < len(keys) and keys[ss] == key:
+            self._discard(values[ss])
+            values[ss] = self._store(value)
+        else:
+            keys.insert(ss, key)
+            values.insert(ss, self._store(value))
+            self._pages.key_count += 1
+        if BTree._leaf_size(keys, values) <= self._pages.page_size:
+            self._write_leaf(page, keys, values, extra)
+            return None
+        mid = len(keys) // 2
+        right = self._pages.allocate()
+        self._write_leaf(right, keys[mid:], values[mid:], extra)
+        self._write_leaf(page, keys[:mid], values[:mid], right)
+        return keys[mid], right
+
+    def delete(self, key):
+        ''' Remove a key. False if not found. '''
+        page, keys, values, extra = self._leaf_for(key)
+        ss = bisect_left(keys, key)
+        if ss >= len(keys) or keys[ss] != key:
+            return False
+        try:
+            self._discard(values[ss])
+            del keys[ss]
+            del values[ss]
+            self._write_leaf(page, keys, values, extra)
+            self._pages.key_count -= 1
+            self._pages.write_header()
+        except Exception:
+            self._pages.rollback()
+            raise
+        self._pages.commit()
+        return True
+
+    def items(self):
+        ''' Iterate over every (key, value), in key order. '''
+        page = self._pages.root
+        while True:
+            kind, keys, values, extra = self._read_node(page)
+            if kind == BTree.LEAF:
+                break
+            page = extra
+        while page:
+            kind, keys, values, page = self._read_node(page)
+            for key, value in zip(keys, values):
+                yield key, self._load(value)
+
+    def keys(self):
+        ''' Iterate over every key, in key order. '''
+        for key, value in self.items():
+            yield key
+
+
+class _PagedRows:
+
+    ''' The dictionary-style view of a B-tree that RowArray expects of its ._db.
+    Rows marked for deletion are kept as empty values, until .pack(). '''
+
+    def __init__(self, tree):
+        self._tree = tree
+
+    def __contains__(self, key):
+        return bytes(key, 'utf-8') in self._tree
+
+    def __getitem__(self, key):
+        value = self._tree.get(bytes(key, 'utf-8'))
+        if value is None:
+            raise KeyError(key)
+        if not value:
+            return None
+        return RowOne.FromString(BinSerializer.loads(value))
+
+    def __setitem__(self, key, row):
+        if row is None:
+            self._tree.put(bytes(key, 'utf-8'), b'')
+        else:
+            self._tree.put(bytes(key, 'utf-8'), BinSerializer.dumps(dict(row._data)))
+
+    def __delitem__(self, key):
+        if not self._tree.delete(bytes(key, 'utf-8')):
+            raise KeyError(key)
+
+    def __iter__(self):
+        for key in self._tree.keys():
+            yield str(key, 'utf-8')
+
+    def __len__(self):
+        return len(self._tree)
+
+    def keys(self):
+        return list(self)
+
+    def clear(self):
+        for key in self.keys():
+            del self[key]
+
+
+class PagedRowArray(RowArray):
+
+    '''
+    A RowArray whose rows live in a page file, keyed by RowOne.id. Every
+    .append(), .update(), or .delete() is a point-write of O(log n) pages.
+    Unlike the in-memory RowArray, a row returned by .lookup() is a copy:
+    use .update() to save any changes. Rows are iterated in id order.
+    '''
+
+    def __init__(self, file):
+        self._pages = PageFile(file)
+        self._db = _PagedRows(BTree(self._pages))
+
+    @property
+    def file(self):
+        ''' Query the page file-name. '''
+        return self._pages.file
+
+    def pack(self):
+        ''' Remove any items marked for deletion from the page file. '''
+        for key in self._db.keys():
+            if self._db._tree.get(bytes(key, 'utf-8')) == b'':
+                del self._db[key]
+
+    def sync(self):
+        ''' Flush all writes to the storage device. '''
+        self._pages.sync()
+
+    def close(self):
+        self._pages.close()
+
+    def export_zip(self, archive, file):
+        ''' Save the active rows as a portable, ZIP-format, snapshot. '''
+        return archive.archive_first(RowArray.ToList(self), file, overwrite=True)
+
+    def import_zip(self, archive, file):
+        ''' Append / update every row from a ZIP-format snapshot. False on error. '''
+        rows = RowArray.FromString(archive.read_archive(file))
+        if rows is False:
+            return False
+        for key in rows._db:
+            self._db[key] = rows._db[key]
+        return True
+
+
+class PageArchive(ZipArchiveBase):
+
+    '''
+    The ZipArchiveBase API, backed by a page file rather than by a ZIP.
+    Archived files can be re-archived in place. Use .export_zip() to create
+    a portable copy.
+    '''
+
+    def __init__(self, archive_file="Enigma.zdp", codec=None):
+        super().__init__(archive_file, codec)
+        self._tree = None
+
+    def _open(self, create=False):
+        ''' Open the page file. Only archiving will create one. '''
+        if not self._tree:
+            if not create and not self.exists():
+                raise FileNotFoundError(self._file)
+            self._tree = BTree(PageFile(self._file))
+        return self._tree
+
+    def close(self):
+        if self._tree:
+            self._tree._pages.close()
+            self._tree = None
+
+    def destroy(self):
+        self.close()
+        return super().destroy()
+
+    def list(self):
+        return [str(key, 'utf-8') for key in self._open().keys()]
+
+    def read_archive(self, file):
+        try:
+            data = self._open().get(bytes(file, 'utf-8'))
+            if data is None:
+                return False
+            tag = data[1:1 + data[0]]
+            codec = Codec.FromTag(tag, self._codec.cipher)
+            if self._codec.cipher and not codec.cipher:
+                return False
+            aad = ZipArchiveBase.Aad(file, tag) if codec.cipher else b''
+            return self._de(data[1 + data[0]:], codec, aad)
+        except Exception as ex:
+            return False
+
+    def archive_first(self, message, file, overwrite=False, compress_type=None):
+        ''' The new page file is built aside, then swapped in: a failure, or a
+        crash, leaves either the prior archive or the new one. '''
+        if not overwrite and self.exists():
+            return False
+        self.close()
+        if self.exists():
+            PageFile(self._file).close()  # Apply any journal a crash left behind.
+        target = self._file
+        self._file = target + '.tmp'
+        try:
+            for name in (self._file, self._file + PageFile.JOURNAL):
+                if os.path.exists(name):
+                    os.unlink(name)
+            bOkay = self.archive_next(message, file)
+            self.close()
+        finally:
+            self._file = target
+        if not bOkay:
+            if os.path.exists(target + '.tmp'):
+                os.unlink(target + '.tmp')
+            return False
+        os.replace(target + '.tmp', target)
+        return True
+
+    def archive_next(self, message, file, compress_type=None):
+        try:
+            if ZipArchiveBase.IsStream(message):
+                chunks = list(message)
+                message = (b'' if chunks and isinstance(chunks[0], bytes) else '').join(chunks)
+            codec = self._codec.For(message)
+            tag = codec.tag()
+            aad = ZipArchiveBase.Aad(file, tag) if codec.cipher else b''
+            self._open(create=True).put(bytes(file, 'utf-8'), bytes([len(tag)]) + tag + self._en(message, codec, aad))
+            return True
+        except Exception as ex:
+            return False
+
+    def archive_batch(self, members, compress_type=None):
+        for member in members:
+            if not self.archive_next(member[0], member[1]):
+                return False
+        return True
+
+    def superseded(self):
+        return 0 # Files are re-archived in place.
+
+    def archive_replace(self, message, file):
+        return self.archive_next(message, file)
+
+    def compact(self, keep=None):
+        if not self.exists():
+            return False
+        for name in self.list():
+            if keep and not keep(name):
+                self._open().delete(bytes(name, 'utf-8'))
+        return True
+
+    def export_zip(self, archive):
+        ''' Copy every archived file into a ZipArchiveBase. '''
+        archive.destroy()
+        for name in self.list():
+            value = self.read_archive(name)
+            if archive.exists():
+                bOkay = archive.archive_next(value, name)
+            else:
+                bOkay = archive.archive_first(value, name)
+            if not bOkay:
+                return False
+        return True
+
+
+if __name__ == '__main__':
+    import random
+    import tempfile
+    with tempfile.TemporaryDirectory() as folder:
+        # B-tree basics, including splits, overflow pages, and page re-use:
+        tree = BTree(PageFile(os.path.join(folder, 'tree.zdp'), page_size=512))
+        keys = [bytes('key%05d' % ss, 'utf-8') for ss in range(2000)]
+        random.seed(9000)
+        random.shuffle(keys)
+        for key in keys:
+            tree.put(key, key * 2)
+        assert(len(tree) == 2000)
+        assert(list(tree.keys()) == sorted(keys))
+        for key in keys[:50]:
+            assert(tree.get(key) == key * 2)
+        assert(tree.get(b'nope') is None)
+        big = b'B' * 5000
+        tree.put(keys[0], big)
+        assert(tree.get(keys[0]) == big)
+        pages = tree._pages.page_count
+        tree.put(keys[0], b'small')
+        tree.put(keys[1], big)
+        assert(tree._pages.page_count == pages)
+        assert(tree.delete(keys[2]))
+        assert(tree.delete(keys[2]) == False)
+        assert(keys[2] not in tree)
+        assert(len(tree) == 1999)
+        tree._pages.close()
+        tree = BTree(PageFile(os.path.join(folder, 'tree.zdp')))
+        assert(len(tree) == 1999)
+        assert(tree.get(keys[1]) == big)
+        assert(tree.get(keys[3]) == keys[3] * 2)
+        tree._pages.close()
+
+        # A crash loses no committed write, and never leaves half of a split:
+        zfile = os.path.join(folder, 'crash.zdp')
+        tree = BTree(PageFile(zfile, page_size=512))
+        for key in keys[:300]:
+            tree.put(key, key)
+        tree._pages.checkpoint()
+        size = os.path.getsize(zfile)
+        for key in keys[300:600]:
+            tree.put(key, key)
+        assert(os.path.getsize(zfile) == size)  # Splits are only journaled.
+        tree._pages._log.close()  # Crash: no checkpoint.
+        tree._pages._fh.close()
+        with open(zfile + PageFile.JOURNAL, 'ab') as fh:
+            fh.write(b'Torn record')
+        tree = BTree(PageFile(zfile))
+        assert(len(tree) == 600)
+        assert(list(tree.keys()) == sorted(keys[:600]))
+        # A failed operation is rolled back, in memory as well:
+        pages = tree._pages.page_count
+        tree._pages.write = None
+        try:
+            tree.put(b'failed', b'value')
+            assert(False)
+        except TypeError:
+            del tree._pages.write
+        assert(tree._pages.page_count == pages and len(tree) == 600)
+        assert(tree.get(b'failed') is None)
+        tree._pages.close()
+        assert(not os.path.exists(zfile + PageFile.JOURNAL))
+
+        # The RowArray API:
+        db = PagedRowArray(os.path.join(folder, 'rows.zdp'))
+        row = db.create()
+        assert(db.count() == 1)
+        row.subject = "Persisted"
+        row.data = "x" * 10000
+        assert(db.lookup(row).subject == '')
+        assert(db.update(row))
+        assert(db.lookup(row).subject == "Persisted")
+        assert(db.lookup(row.id).data == row.data)
+        for ss in range(300):
+            zrow = RowOne()
+            zrow.subject = "Row %d" % ss
+            assert(db.append(zrow))
+        assert(db.count() == 301)
+        assert(db.exists(zrow))
+        assert(db.delete(zrow))
+        assert(db.count() == 300 and db.count_deleted() == 1)
+        db.pack()
+        assert(db.count_deleted() == 0)
+        assert(len(db.get_subjects()) == 300)
+        archive = ZipArchiveBase(os.path.join(folder, 'rows.zdb'))
+        assert(db.export_zip(archive, "ZibDB.txt"))
+        db.close()
+        db = PagedRowArray(os.path.join(folder, 'rows.zdp'))
+        assert(db.count() == 300)
+        assert(db.lookup(row).data == row.data)
+        db.clear()
+        assert(db.count() == 0)
+        assert(db.import_zip(archive, "ZibDB.txt"))
+        assert(db.count() == 300)
+        assert(RowArray.FromString(archive.read_archive("ZibDB.txt")).count() == 300)
+        db.close()
+
+        # The ZipArchiveBase API:
+        test = PageArchive(os.path.join(folder, 'members.zdp'))
+        ZipArchiveBase.TestCase(test, cleanup=False)
+        assert(test.archive_next("Updated", "One.TXT"))
+        assert(test.read_archive("One.TXT") == "Updated")
+        assert(test.archive_replace("Replaced", "Two.bin"))
+        assert(test.read_archive("Two.bin") == "Replaced")
+        assert(test.archive_next(iter(["Str", "eamed"]), "Two.bin"))
+        assert(test.read_archive("Two.bin") == "Streamed")
+        assert(len(test.list()) == 5)
+        assert(test.export_zip(archive))
+        assert(archive.read_archive("One.TXT") == "Updated")
+        assert(len(archive.list()) == 5)
+        # An overwrite that fails leaves the prior archive:
+        def failing():
+            yield "Partial"
+            raise IOError("Source went away")
+        assert(test.archive_first(failing(), "Bad.txt", overwrite=True) == False)
+        assert(test.read_archive("One.TXT") == "Updated")
+        assert(test.archive_first("Fresh", "New.txt", overwrite=True))
+        assert(test.list() == ["New.txt"])
+        assert(not os.path.exists(test._file + '.tmp'))
+        assert(test.destroy())
+
+        # Encrypted files are bound to their names:
+        from ZipNotes.Codecs import AESGCM, Cipher
+        if AESGCM:
+            test = PageArchive(os.path.join(folder, 'sealed.zdp'), Codec(cipher=Cipher("Sesame")))
+            assert(test.archive_first("Alpha", "a.txt") and test.archive_next("Beta", "b.txt"))
+            assert(test.read_archive("a.txt") == "Alpha")
+            tree = test._open()
+            alpha, beta = tree.get(b"a.txt"), tree.get(b"b.txt")
+            tree.put(b"a.txt", beta)
+            tree.put(b"b.txt", alpha)
+            assert(test.read_archive("a.txt") == False and test.read_archive("b.txt") == False)
+            test.close()
+            forger = PageArchive(test.file)
+            assert(forger.archive_next("Forged", "c.txt"))
+            forger.close()
+            assert(test.read_archive("c.txt") == False)
+            assert(test.destroy())
+    print("Testing Success")
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+
+# Mission: Opportunity to keep recent notes quick to read. Rows are archived
+# into time buckets (day, month, or year) with a manifest recording each
+# bucket's time range, so a time-range scan opens only those buckets that
+# overlap. Cold buckets use heavier compression.
+
+# Status: Testing Success
+# Date Created: 2026-10-19
+
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+import hashlib
+import time
+from collections import OrderedDict
+from zipfile import ZIP_LZMA
+
+from ZipNotes.RowArray import RowArray
+
+class TimePartitions:
+
+    '''
+    Save a RowArray into an archive (ZipArchiveBase) as one file per time
+    bucket ("parts/<bucket>"), plus a manifest ("_parts/manifest") of each
+    bucket's min / max RowOne.time, row count, digest, "rows" digest (of
+    each row's content, in any row / field order), and - once .mark_synced() -
+    the "synced" rows digest. The content hash of every row is kept by bucket
+    ("_parts/hashes"), and - once .mark_synced() - as of the sync
+    ("_parts/synced".) Only changed buckets are re-archived, in one batch.
+    Superseded copies are compacted away once they outnumber the latest ones.
+    Buckets whose newest row is older than "cold_after" seconds are archived
+    using ZIP_LZMA.
+    '''
+
+    PART_DIR = "parts/"
+    MANIFEST = "_parts/manifest"
+    HASHES = "_parts/hashes"
+    SYNCED = "_parts/synced"
+    BUCKETS = {'day': '%Y-%m-%d', 'month': '%Y-%m', 'year': '%Y'}
+    COLD_AFTER = 365 * 24 * 60 * 60
+
+    def __init__(self, archive, bucket='month', cold_after=None):
+        if bucket not in TimePartitions.BUCKETS:
+            raise ValueError("Unknown bucket: " + str(bucket))
+        self._archive = archive
+        self._bucket = bucket
+        self._cold_after = TimePartitions.COLD_AFTER if cold_after is None else cold_after
+
+    @property
+    def archive(self):
+        ''' Query the archive. '''
+        return self._archive
+
+    def bucket(self, when):
+        ''' The (GMT) bucket name for a time. '''
+        return time.strftime(TimePartitions.BUCKETS[self._bucket], time.gmtime(when))
+
+    def manifest(self):
+        ''' Return the manifest: {file name: {'min', 'max', 'count', 'digest', 'rows', 'cold', ['synced']}} '''
+        return self._read_dict(TimePartitions.MANIFEST)
+
+    def hashes(self):
+        ''' Return the content hash of every archived row, by bucket: {file name: {id: hash}} '''
+        return self._read_dict(TimePartitions.HASHES)
+
+    def synced(self):
+        ''' Return the content hash of every row as of the last .mark_synced(): {id: hash} '''
+        return self._read_dict(TimePartitions.SYNCED)
+
+    def _read_dict(self, file):
+        if not self._archive.exists():
+            return OrderedDict()
+        value = self._archive.read_archive(file)
+        if not value:
+            return OrderedDict()
+        return OrderedDict(eval(value))
+
+    def save(self, rows, now=None):
+        ''' Archive the active rows, by bucket. Returns the number of buckets
+        re-archived, else False on error. '''
+        if now is None:
+            now = time.time()
+        parts = OrderedDict()
+        for key in rows._db:
+            row = rows._db[key]
+            if row:
+                name = TimePartitions.PART_DIR + self.bucket(row.time)
+                parts.setdefault(name, RowArray()).append(row)
+        prior = self.manifest()
+        manifest = OrderedDict()
+        hashes = OrderedDict()
+        members = list()
+        tally = 0
+        for name in sorted(parts):
+            value = RowArray.ToString(parts[name])
+            was = prior.get(name)
+            hashes[name] = TimePartitions.Hashes(parts[name])
+            entry = self._entry(parts[name], value, now, was, hashes[name])
+            manifest[name] = entry
+            if was and was['digest'] == entry['digest'] and was['cold'] == entry['cold']:
+                continue
+            members.append((value, name, ZIP_LZMA if entry['cold'] else None))
+            tally += 1
+        for name in prior:
+            if name not in manifest:
+                members.append((repr([]), name, None))
+        if tally or list(prior) != list(manifest):
+            members.append((repr(dict(manifest)), TimePartitions.MANIFEST, None))
+        if hashes != self.hashes():
+            members.append((repr(dict(hashes)), TimePartitions.HASHES, None))
+        if not self._store(members):
+            return False
+        return tally
+
+    def _entry(self, rows, value, now, was=None, hashes=None):
+        times = [row.time for key, row in rows._db.items()]
+        if hashes is None:
+            hashes = TimePartitions.Hashes(rows)
+        result = {'min': min(times), 'max': max(times), 'count': len(times),
+                  'digest': hashlib.sha1(value.encode('utf-8')).hexdigest(),
+                  'rows': TimePartitions.HashDigest(hashes),
+                  'cold': max(times) < now - self._cold_after}
+        if was and 'synced' in was:
+            result['synced'] = was['synced']
+        return result
+
+    def mark_synced(self):
+        ''' Record every row's content as synced (see Sync.ArchiveSync.) Returns
+        the number of buckets newly marked, else False on error. '''
+        manifest = self.manifest()
+        hashes = self.hashes()
+        synced = dict()
+        tally = 0
+        for name, entry in manifest.items():
+            synced.update(hashes.get(name, {}))
+            if entry.get('synced') != entry['rows']:
+                entry['synced'] = entry['rows']
+                tally += 1
+        members = list()
+        if tally or synced != self.synced():
+            members.append((repr(synced), TimePartitions.SYNCED, None))
+        if tally:
+            members.append((repr(dict(manifest)), TimePartitions.MANIFEST, None))
+        if not self._store(members):
+            return False
+        return tally
+
+    @staticmethod
+    def RowHash(row):
+        ''' Digest the content of a row - in any field order. '''
+        fields = sorted(row._data.items(), key=lambda item: item[0])
+        return hashlib.sha1(repr(fields).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def Hashes(rows):
+        ''' The content hash of every active row: {id: hash} '''
+        return dict((key, TimePartitions.RowHash(row)) for key, row in rows._db.items() if row)
+
+    @staticmethod
+    def HashDigest(hashes):
+        ''' Digest a set of row hashes, as from .Hashes() - in any order. '''
+        pairs = sorted("%s %s" % (key, hashes[key]) for key in hashes)
+        return hashlib.sha1('\n'.join(pairs).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def Digest(rows):
+        ''' Digest the content of the active rows - in any order. '''
+        return TimePartitions.HashDigest(TimePartitions.Hashes(rows))
+
+    def read(self, name):
+        ''' Return a bucket file's RowArray. Missing buckets are empty. False on error. '''
+        if not self._archive.exists() or name not in self.manifest():
+            return RowArray()
+        return RowArray.FromString(self._archive.read_archive(name))
+
+    def replace(self, parts, now=None):
+        ''' Re-archive only the bucket files given, as {file name: RowArray}, then
+        update the manifest. Empty RowArrays empty their bucket. The rows must
+        belong to their bucket. Returns the number of buckets re-archived, else
+        False on error. '''
+        if now is None:
+            now = time.time()
+        manifest = self.manifest()
+        hashes = self.hashes()
+        members = list()
+        for name in sorted(parts):
+            rows = RowArray()
+            for key in parts[name]._db:
+                if parts[name]._db[key]:
+                    rows.append(parts[name]._db[key])
+            if not rows.count():
+                hashes.pop(name, None)
+                if name in manifest:
+                    del manifest[name]
+                    members.append((repr([]), name, None))
+                continue
+            value = RowArray.ToString(rows)
+            hashes[name] = TimePartitions.Hashes(rows)
+            manifest[name] = self._entry(rows, value, now, manifest.get(name), hashes[name])
+            members.append((value, name, ZIP_LZMA if manifest[name]['cold'] else None))
+        manifest = OrderedDict(sorted(manifest.items()))
+        members.append((repr(dict(manifest)), TimePartitions.MANIFEST, None))
+        members.append((repr(dict(sorted(hashes.items()))), TimePartitions.HASHES, None))
+        if not self._store(members):
+            return False
+        return len(parts)
+
+    def _store(self, members):
+        ''' Archive (message, file, compress_type) members as one batch. Once
+        superseded copies outnumber the latest ones, the archive is compacted. '''
+        if not members:
+            return True
+        if not self._archive.archive_batch(members):
+            return False
+        stale = self._archive.superseded()
+        if stale and stale * 2 > len(self._archive.list()):
+            return self._archive.compact()
+        return True
+
+    def partitions(self, start=None, end=None):
+        ''' List the bucket files overlapping the time range (inclusive.) '''
+        results = list()
+        for name, entry in self.manifest().items():
+            if start is not None and entry['max'] < start:
+                continue
+            if end is not None and entry['min'] > end:
+                continue
+            results.append(name)
+        return results
+
+    def scan(self, start=None, end=None):
+        ''' Return a RowArray of every row within the time range (inclusive),
+        reading only the overlapping buckets. '''
+        results = RowArray()
+        for name in self.partitions(start, end):
+            rows = RowArray.FromString(self._archive.read_archive(name))
+            if not rows:
+                continue
+            for key in rows._db:
+                row = rows._db[key]
+                if start is not None and row.time < start:
+                    continue
+                if end is not None and row.time > end:
+                    continue
+                results.append(row)
+        return results
+
+
+if __name__ == '__main__':
+    import tempfile
+    from zipfile import ZipFile
+    from ZipNotes.Row import RowOne
+    from ZipNotes.ZipBase import ZipArchiveBase
+    day = 24 * 60 * 60
+    now = 1700000000
+    with tempfile.TemporaryDirectory() as folder:
+        archive = ZipArchiveBase(os.path.join(folder, 'parts.zdb'))
+        parts = TimePartitions(archive, bucket='month', cold_after=90 * day)
+        db = RowArray()
+        for ss in range(24):
+            row = RowOne(time=now - ss * 15 * day)
+            row.subject = "Row %d" % ss
+            db.append(row)
+        assert(parts.save(db, now=now) == 12)
+        manifest = parts.manifest()
+        assert(len(manifest) == 12)
+        assert(sum(entry['count'] for entry in manifest.values()) == 24)
+        assert(parts.save(db, now=now) == 0)
+        # Only the overlapping buckets are read:
+        assert(len(parts.partitions(now - 10 * day, now)) == 1)
+        assert(parts.scan(now - 10 * day, now).count() == 1)
+        assert(len(parts.partitions(now - 20 * day, now)) == 2)
+        assert(parts.scan(now - 20 * day, now).count() == 2)
+        assert(parts.scan().count() == 24)
+        assert(parts.scan(now + 1).count() == 0)
+        # Cold buckets use heavier compression:
+        with ZipFile(archive.file) as zZip:
+            for name, entry in manifest.items():
+                info = zZip.getinfo(name)
+                assert((info.compress_type == ZIP_LZMA) == entry['cold'])
+        assert(any(entry['cold'] for entry in manifest.values()))
+        # Only changed buckets are re-archived:
+        row.subject = "Changed"
+        db.delete(db.lookup(list(db.get_subjects())[0]))
+        assert(parts.save(db, now=now) == 1)
+        assert(len(parts.manifest()) == 11)
+        assert(parts.scan().count() == 23)
+        assert(parts.scan(row.time, row.time).lookup(row.id).subject == "Changed")
+        # Buckets are RowArrays, the manifest is not. Emptied buckets are kept empty:
+        assert(len(archive.row_files()) == 12)
+        assert(RowArray.FromString(archive.read_archive("parts/2023-11")).count() == 0)
+        assert(archive.compact())
+        assert(parts.scan().count() == 23)
+        # Buckets can be read, and replaced, one at a time:
+        name = parts.partitions(row.time, row.time)[0]
+        bucket = parts.read(name)
+        assert(bucket.count() == parts.manifest()[name]['count'])
+        assert(TimePartitions.Digest(bucket) == parts.manifest()[name]['rows'])
+        zbucket = RowArray.FromString(RowArray.ToString(bucket))
+        list(zbucket._db.values())[0].set('zz', 1)
+        assert(TimePartitions.Digest(zbucket) != TimePartitions.Digest(bucket))
+        zrow = RowOne(time=row.time)
+        bucket.append(zrow)
+        assert(parts.replace({name: bucket}, now=now) == 1)
+        assert(parts.read(name).lookup(zrow.id) is not None)
+        assert(parts.scan().count() == 24)
+        assert(parts.replace({name: RowArray()}, now=now) == 1)
+        assert(name not in parts.manifest())
+        assert(parts.read(name).count() == 0)
+        # Sync marks survive saves, until their bucket's content changes:
+        assert(parts.mark_synced() == len(parts.manifest()))
+        assert(parts.synced() == TimePartitions.Hashes(parts.scan()))
+        assert(parts.mark_synced() == 0)
+        db = parts.scan()
+        assert(parts.save(db, now=now) == 0)
+        zrow = db.lookup(list(db.get_subjects())[0])
+        zrow.data = "Changed"
+        assert(db.update(zrow))
+        assert(parts.save(db, now=now) == 1)
+        assert(sum(1 for entry in parts.manifest().values() if entry['synced'] != entry['rows']) == 1)
+        # Superseded copies never outnumber the latest:
+        for ss in range(30):
+            zrow.data = "Changed %d" % ss
+            assert(db.update(zrow))
+            assert(parts.save(db, now=now) == 1)
+            assert(archive.superseded() * 2 <= len(archive.list()))
+        assert(parts.scan().lookup(zrow.id).data == "Changed 29")
+        assert(TimePartitions(archive, bucket='year').bucket(now) == '2023')
+        assert(TimePartitions(archive, bucket='day').bucket(now) == '2023-11-14')
+    print("Testing Success")
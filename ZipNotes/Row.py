@@ -145,10 +145,13 @@ class RowOne:
         ''' Populate a Row from a dictionary. Note that the dictionary does
         not necessarily have to be a Row, to have the default RowOne() properies added.
         Strategy allows for unique data values to be provided. Note also that if the
-        time key is not integral, then the present time will be used. Returns
-        False on error.        '''
+        time key is not integral, then the present time will be used. An already
+        decoded dictionary is also accepted. Returns False on error.        '''
         try:
-            obj = eval(string)
+            if isinstance(string, dict):
+                obj = string
+            else:
+                obj = eval(string)
             result = RowOne()
             for key in obj:
                 result._data[key] = obj[key]
@@ -9,20 +9,29 @@
 # Date Created: 2019-02-15
 import os
 import sys
-sys.path.insert(1, os.path.join(sys.path[0], '../..'))
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
 
 from collections import OrderedDict
 
 from ZipNotes.Row import RowOne
+from ZipNotes.Metrics import REGISTRY
 
 class RowArray:
 
+    _feed = None # A ChangeFeed.ChangeFeed, once one has been attached.
+
     def __init__(self):
         self._db = OrderedDict()
 
+    def _changed(self, op, row=None):
+        ''' Report a change to any attached feed. '''
+        if self._feed:
+            self._feed.publish(op, row)
+
     def clear(self):
         ''' Remove all items from the databases. '''
         self._db.clear()
+        self._changed('clear')
 
     def pack(self):
         ''' Remove any items marked for deletion from the database. '''
@@ -52,6 +61,7 @@ class RowArray:
         ''' Create a new row in the database. '''
         result = RowOne()
         self._db[result.id] = result
+        self._changed('create', result)
         return result
 
     def exists(self, row):
@@ -68,6 +78,7 @@ class RowArray:
         if unique and row.id in self._db:
             return False
         self._db[row.id] = row
+        self._changed('append', row)
         return True
 
     def get_subjects(self):
@@ -82,7 +93,9 @@ class RowArray:
         if isinstance(key, RowOne):
             return self.lookup(key.id)
         if key in self._db:
+            REGISTRY.hit('rows.lookup', True)
             return self._db[key]
+        REGISTRY.hit('rows.lookup', False)
         return None
 
     def read(self, row):
@@ -100,6 +113,7 @@ class RowArray:
             return False
         if row.id in self._db:
             self._db[row.id] = row
+            self._changed('update', row)
             return True
         else:
             return False
@@ -113,6 +127,7 @@ class RowArray:
             return False
         if row.id in self._db:
             self._db[row.id] = None
+            self._changed('delete', row)
             return True
         else:
             return False
@@ -120,14 +135,18 @@ class RowArray:
     @staticmethod
     def FromString(string):
         ''' Create & populate a RowArray from the result of its prior ToString()
-        operation. '''
+        operation - or from the result of a prior ToList(), once decoded. '''
         results = RowArray()
         try:
-            values = eval(string)
-            for value in values:
-                zobj = RowOne.FromString(value)
-                if zobj:
-                    results.append(zobj)
+            with REGISTRY.timer('rows.parse'):
+                if isinstance(string, (list, tuple)):
+                    values = string
+                else:
+                    values = eval(string)
+                for value in values:
+                    zobj = RowOne.FromString(value)
+                    if zobj:
+                        results.append(zobj)
             return results
         except:
             return False
@@ -137,14 +156,50 @@ class RowArray:
         ''' Create a string representing of the entire database. Items marked for
         deletion WILL be omitted from the final string representation. This operation
         returns False on error. '''
+        if not isinstance(instance, RowArray):
+            return False
+        with REGISTRY.timer('rows.format'):
+            results = list()
+            for key in instance._db:
+                value = instance._db[key]
+                if value:
+                    results.append(RowOne.ToString(value))
+            return str(results)
+
+    @staticmethod
+    def IterString(instance, rows_per_chunk=64):
+        ''' Generate the same string as ToString(), in chunks of "rows_per_chunk"
+        rows, so that the entire database need never be in memory at once.
+        Yields nothing on error. '''
+        if not isinstance(instance, RowArray):
+            return
+        chunk = ['[']
+        sep = ''
+        for key in instance._db:
+            value = instance._db[key]
+            if value:
+                chunk.append(sep)
+                chunk.append(repr(RowOne.ToString(value)))
+                sep = ', '
+                if len(chunk) >= rows_per_chunk * 2:
+                    yield ''.join(chunk)
+                    chunk = list()
+        chunk.append(']')
+        yield ''.join(chunk)
+
+    @staticmethod
+    def ToList(instance):
+        ''' Create a list of row-dictionaries for the entire database, ready for
+        a structured codec (see Codecs.Codec.) Items marked for deletion WILL
+        be omitted. This operation returns False on error. '''
         if not isinstance(instance, RowArray):
             return False
         results = list()
         for key in instance._db:
             value = instance._db[key]
             if value:
-                results.append(RowOne.ToString(value))
-        return str(results)
+                results.append(dict(value._data))
+        return results
         
 
 
@@ -203,6 +258,15 @@ if __name__ == '__main__':
     assert(db2.lookup(zrow).data == "My Data")
     zrow.subject = "My Subject"
     assert(db2.lookup(zrow).subject == "My Subject")
+    # Test streaming:
+    assert(''.join(RowArray.IterString(db2, rows_per_chunk=1)) == RowArray.ToString(db2))
+    assert(''.join(RowArray.IterString(RowArray())) == RowArray.ToString(RowArray()))
+    assert(len(list(RowArray.IterString(db2, rows_per_chunk=1))) == 4)
+    # Test list conversion:
+    db3 = RowArray.FromString(RowArray.ToList(db2))
+    assert(db3.count() == 3)
+    assert(db3.lookup(zrow).data == "My Data")
+    assert(RowArray.ToList(db3) == RowArray.ToList(db2))
     print("Testing Success")
    
     
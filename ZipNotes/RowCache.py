@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+# Mission: Opportunity to keep the rows a user is clicking through decoded,
+# and at hand. A bounded, least-recently-used, row cache sits in front of
+# any RowArray's .lookup(), with pinning for the rows being edited / viewed.
+
+# Status: Testing Success
+# Date Created: 2026-10-19
+
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from collections import OrderedDict
+
+from ZipNotes.Row import RowOne
+from ZipNotes.Metrics import REGISTRY
+
+class RowCache:
+
+    '''
+    An LRU cache of rows, bounded by payload bytes. Pinned rows are never
+    evicted. Use .focus() to pin a selected row together with its neighbours
+    in a list, releasing whatever was focused upon before. Writes go through
+    to the source RowArray via .update().
+    '''
+
+    MAX_BYTES = 8 * 1024 * 1024
+    OVERHEAD = 128 # Rough per-row bookkeeping, in bytes.
+
+    def __init__(self, source, max_bytes=None):
+        self._source = source
+        self._max_bytes = max_bytes if max_bytes else RowCache.MAX_BYTES
+        self._rows = OrderedDict()
+        self._sizes = dict()
+        self._pins = dict()
+        self._focus = list()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def Size(row):
+        ''' Estimate the memory used by a row's values. '''
+        size = RowCache.OVERHEAD
+        for key, value in row:
+            if isinstance(value, (str, bytes)):
+                size += len(value)
+        return size
+
+    def lookup(self, key):
+        ''' Retrieve a row by id (or RowOne.) None if not found. '''
+        if isinstance(key, RowOne):
+            key = key.id
+        row = self._rows.get(key)
+        if row is not None:
+            self._rows.move_to_end(key)
+            self._hits += 1
+            REGISTRY.hit('rows.cache', True)
+            return row
+        self._misses += 1
+        REGISTRY.hit('rows.cache', False)
+        row = self._source.lookup(key)
+        if row is not None:
+            self._store(key, row)
+        return row
+
+    def _store(self, key, row):
+        if key in self._rows:
+            self._bytes -= self._sizes[key]
+        self._rows[key] = row
+        self._rows.move_to_end(key)
+        self._sizes[key] = RowCache.Size(row)
+        self._bytes += self._sizes[key]
+        self._evict()
+
+    def _evict(self):
+        if self._bytes <= self._max_bytes:
+            return
+        for key in list(self._rows):
+            if self._bytes <= self._max_bytes:
+                break
+            if key in self._pins:
+                continue
+            self._drop(key)
+            self._evictions += 1
+
+    def _drop(self, key):
+        del self._rows[key]
+        self._bytes -= self._sizes.pop(key)
+
+    def pin(self, key):
+        ''' Keep a row cached until unpinned. Pins are counted. Returns the row,
+        else None if not found. '''
+        if isinstance(key, RowOne):
+            key = key.id
+        row = self.lookup(key)
+        if row is not None:
+            self._pins[key] = self._pins.get(key, 0) + 1
+        return row
+
+    def unpin(self, key):
+        ''' Release a pin. False if the row was not pinned. '''
+        if isinstance(key, RowOne):
+            key = key.id
+        if key not in self._pins:
+            return False
+        self._pins[key] -= 1
+        if not self._pins[key]:
+            del self._pins[key]
+            self._evict()
+        return True
+
+    def focus(self, keys, index, radius=1):
+        ''' Pin the row at keys[index], as well as its "radius" neighbours, releasing
+        the prior focus. Returns the row at keys[index]. '''
+        prior = self._focus
+        self._focus = list()
+        result = None
+        for ss in range(max(0, index - radius), min(len(keys), index + radius + 1)):
+            row = self.pin(keys[ss])
+            if row is not None:
+                self._focus.append(keys[ss])
+            if ss == index:
+                result = row
+        for key in prior:
+            self.unpin(key)
+        return result
+
+    def update(self, row):
+        ''' Update the source, then the cache. False if the source did not. '''
+        if not self._source.update(row):
+            return False
+        if row.id in self._rows:
+            self._store(row.id, row)
+        return True
+
+    def invalidate(self, key=None):
+        ''' Forget a cached row - or every unpinned row, when no key is given. '''
+        if key is None:
+            for zkey in list(self._rows):
+                if zkey not in self._pins:
+                    self._drop(zkey)
+            return True
+        if isinstance(key, RowOne):
+            key = key.id
+        if key not in self._rows:
+            return False
+        self._pins.pop(key, None)
+        if key in self._focus:
+            self._focus.remove(key)
+        self._drop(key)
+        return True
+
+    def stats(self):
+        ''' Return the hits, misses, evictions, rows, bytes, and pinned count. '''
+        total = self._hits + self._misses
+        return {'hits': self._hits, 'misses': self._misses,
+                'hit_rate': self._hits / total if total else None,
+                'evictions': self._evictions, 'rows': len(self._rows),
+                'bytes': self._bytes, 'pinned': len(self._pins)}
+
+
+if __name__ == '__main__':
+    from ZipNotes.RowArray import RowArray
+
+    class CountingRows(RowArray):
+        def __init__(self):
+            super().__init__()
+            self.lookups = 0
+        def lookup(self, key):
+            self.lookups += 1
+            return super().lookup(key)
+
+    db = CountingRows()
+    for ss in range(20):
+        row = db.create()
+        row.data = "x" * 1000
+    keys = list(db.get_subjects())
+    size = RowCache.Size(db.lookup(keys[0]))
+    db.lookups = 0
+    cache = RowCache(db, max_bytes=size * 5)
+    for key in keys:
+        assert(cache.lookup(key).id == key)
+    assert(db.lookups == 20)
+    stats = cache.stats()
+    assert(stats['rows'] == 5 and stats['evictions'] == 15)
+    assert(stats['bytes'] <= size * 5)
+    assert(cache.lookup(keys[-1]).id == keys[-1])
+    assert(db.lookups == 20)
+    assert(cache.lookup("missing") is None)
+    # The focused row, and its neighbours, survive eviction:
+    assert(cache.focus(keys, 5).id == keys[5])
+    assert(cache.stats()['pinned'] == 3)
+    for key in keys[10:]:
+        cache.lookup(key)
+    db.lookups = 0
+    for key in keys[4:7]:
+        cache.lookup(key)
+    assert(db.lookups == 0)
+    # Moving the focus releases the prior pins:
+    assert(cache.focus(keys, 0).id == keys[0])
+    assert(cache.stats()['pinned'] == 2)
+    assert(cache.focus(keys, 19, radius=0).id == keys[19])
+    assert(cache.stats()['pinned'] == 1)
+    # Writes go through:
+    row = cache.lookup(keys[19])
+    row.subject = "Changed"
+    assert(cache.update(row))
+    assert(db.lookup(keys[19]).subject == "Changed")
+    assert(cache.update(RowOne()) == False)
+    assert(cache.invalidate(keys[19]))
+    assert(cache.stats()['pinned'] == 0)
+    assert(cache.invalidate())
+    assert(cache.stats()['rows'] == 0 and cache.stats()['bytes'] == 0)
+    assert(0 < cache.stats()['hit_rate'] < 1)
+    print("Testing Success")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+# Mission: Opportunity to paint the window at once, upon start-up. The last
+# session - archive, first page of subjects, and selection - is saved into a
+# small snapshot file, so the archive itself can be read later on.
+
+# Status: Testing Success
+# Date Created: 2026-10-19
+
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+class LastSession:
+
+    '''
+    A snapshot of the last session: the archive's path, size, and modification
+    time, the first PAGE of (id, subject) pairs, the selected index, and the
+    selected row's id. No row content is kept outside of the archive. Use
+    .is_current() to tell whether the archive has changed since the snapshot
+    was saved.
+    '''
+
+    FILE_NAME = "ZipDB.last"
+    PAGE = 100
+
+    def __init__(self, home_dir='.'):
+        self._home_dir = os.path.normpath(os.path.abspath(home_dir))
+        self._snapshot = dict()
+
+    @property
+    def file(self):
+        ''' Query the snapshot file-name. '''
+        return os.path.join(self._home_dir, LastSession.FILE_NAME)
+
+    @property
+    def archive(self):
+        ''' The archive path, else None. '''
+        return self._snapshot.get('archive')
+
+    @property
+    def page(self):
+        ''' The first page of [id, subject] pairs. '''
+        return self._snapshot.get('page', list())
+
+    @property
+    def index(self):
+        ''' The selected index, else None. '''
+        return self._snapshot.get('index')
+
+    @property
+    def total(self):
+        ''' The number of subjects in the archive, when saved. '''
+        return self._snapshot.get('total', 0)
+
+    @property
+    def selected(self):
+        ''' The id of the selected row, else None. '''
+        return self._snapshot.get('selected')
+
+    def load(self):
+        ''' Load the snapshot file. False if none was found / readable. '''
+        try:
+            with open(self.file) as fh:
+                self._snapshot = dict(eval(fh.read()))
+            return True
+        except:
+            self._snapshot = dict()
+            return False
+
+    def save(self, archive_file, ids, subjects, index=None):
+        ''' Save the snapshot: "ids" in display order, "subjects" as from
+        RowArray.get_subjects(). A partial write never replaces the previous
+        snapshot. False on error. '''
+        try:
+            stat = os.stat(archive_file)
+        except OSError:
+            return False
+        snapshot = {'archive': os.path.abspath(archive_file).replace('\\', '/'),
+                    'size': stat.st_size, 'mtime': stat.st_mtime,
+                    'total': len(ids),
+                    'page': [[key, subjects[key]] for key in ids[:LastSession.PAGE]],
+                    'index': index,
+                    'selected': ids[index] if index is not None and index < len(ids) else None}
+        tmp = self.file + '.tmp'
+        try:
+            with open(tmp, 'w') as fh:
+                fh.write(repr(snapshot))
+            os.replace(tmp, self.file)
+        except:
+            return False
+        self._snapshot = snapshot
+        return True
+
+    def is_current(self):
+        ''' True if the archive is unchanged since the snapshot was saved. '''
+        try:
+            stat = os.stat(self.archive)
+        except (OSError, TypeError):
+            return False
+        return stat.st_size == self._snapshot.get('size') and \
+            stat.st_mtime == self._snapshot.get('mtime')
+
+    def forget(self):
+        ''' Remove the snapshot file. '''
+        self._snapshot = dict()
+        try:
+            os.unlink(self.file)
+            return True
+        except OSError:
+            return False
+
+
+if __name__ == '__main__':
+    import tempfile
+    from ZipNotes.RowArray import RowArray
+    from ZipNotes.ZipBase import ZipArchiveBase
+    with tempfile.TemporaryDirectory() as folder:
+        session = LastSession(folder)
+        assert(session.load() == False)
+        assert(session.archive is None and session.page == [] and session.selected is None)
+        archive = ZipArchiveBase(os.path.join(folder, 'last.zdb'))
+        notes = RowArray()
+        for ss in range(LastSession.PAGE + 20):
+            row = notes.create()
+            row.subject = "Subject %d" % ss
+        archive.archive_first(RowArray.ToString(notes), "ZibDB.txt")
+        subjects = notes.get_subjects()
+        ids = list(subjects)
+        assert(session.save(archive.file, ids, subjects, 3))
+        session = LastSession(folder)
+        assert(session.load())
+        assert(session.archive == archive.file.replace('\\', '/'))
+        assert(len(session.page) == LastSession.PAGE)
+        assert(session.total == LastSession.PAGE + 20)
+        assert(session.page[3] == [ids[3], "Subject 3"])
+        assert(session.index == 3 and session.selected == ids[3])
+        assert(session.is_current())
+        archive.archive_next("More", "more.txt")
+        assert(session.is_current() == False)
+        assert(session.save(os.path.join(folder, 'missing.zdb'), ids, subjects) == False)
+        assert(session.forget())
+        assert(LastSession(folder).load() == False)
+    print("Testing Success")
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+# Mission: Opportunity to keep copies of the same notes (laptop, server) in
+# step, without loading either database in full. Time-partitioned archives
+# are compared by their per-bucket content digests, so only the buckets that
+# differ are read - and only the rows that differ are transferred.
+
+# Status: Testing Success
+# Date Created: 2026-10-19
+
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from ZipNotes.RowArray import RowArray
+from ZipNotes.Partition import TimePartitions
+
+class ArchiveSync:
+
+    '''
+    Merge two Partition.TimePartitions, both ways. Buckets whose content
+    digests match are skipped. Within the buckets that differ, a row missing
+    from one side is copied to it. A row that differs between the sides keeps
+    the version from the side that edited that row since the last sync (see
+    TimePartitions.synced().) Should both (or neither) have, the later
+    RowOne.time wins - else, for equal times, the greater TimePartitions.RowHash,
+    so that both sides always agree. Rows move between buckets, should their time have moved them. Rows
+    are never removed: a row deleted on one side only, returns. Both sides
+    must use the same bucket size.
+    '''
+
+    def __init__(self, left, right):
+        if left.bucket(0) != right.bucket(0):
+            raise ValueError("Both sides must use the same bucket size.")
+        self._sides = (left, right)
+
+    def differing(self):
+        ''' List the bucket files whose digests differ. '''
+        left, right = self._sides[0].manifest(), self._sides[1].manifest()
+        results = list()
+        for name in sorted(set(left) | set(right)):
+            zleft = left.get(name, {}).get('rows')
+            if zleft is None or zleft != right.get(name, {}).get('rows'):
+                results.append(name)
+        return results
+
+    def _load(self, names):
+        ''' Read the buckets from each side: [{file name: RowArray}, ...] '''
+        results = list()
+        for side in self._sides:
+            loaded = dict()
+            for name in names:
+                rows = side.read(name)
+                if rows is False:
+                    raise IOError("Unable to read " + name)
+                loaded[name] = rows
+            results.append(loaded)
+        return results
+
+    @staticmethod
+    def _Hashes(parts):
+        ''' The content hash of every active row: {id: hash} '''
+        results = dict()
+        for name in parts:
+            results.update(TimePartitions.Hashes(parts[name]))
+        return results
+
+    @staticmethod
+    def _Winners(loaded, synced):
+        ''' The winning version of every row: {id: (edited, time, hash, row)} '''
+        results = dict()
+        for parts, zsynced in zip(loaded, synced):
+            for name in parts:
+                for key, row in parts[name]._db.items():
+                    if not row:
+                        continue
+                    zhash = TimePartitions.RowHash(row)
+                    rank = (zsynced.get(key) != zhash, row.time, zhash, row)
+                    best = results.get(key)
+                    if best is None or rank[:3] > best[:3]:
+                        results[key] = rank
+        return results
+
+    def plan(self):
+        ''' Return the row ids each side is to receive: (left ids, right ids) '''
+        names = self.differing()
+        loaded = self._load(names)
+        winners = ArchiveSync._Winners(loaded, [side.synced() for side in self._sides])
+        results = list()
+        for parts in loaded:
+            have = ArchiveSync._Hashes(parts)
+            results.append(sorted(key for key in winners if have.get(key) != winners[key][2]))
+        return tuple(results)
+
+    def run(self, now=None):
+        ''' Synchronize both sides, then mark both as synced. Returns the number
+        of rows each side received, as (left, right), else False on error. '''
+        try:
+            names = self.differing()
+            loaded = self._load(names)
+        except IOError:
+            return False
+        winners = ArchiveSync._Winners(loaded, [side.synced() for side in self._sides])
+        results = list()
+        for side, parts in zip(self._sides, loaded):
+            wanted = dict((name, RowArray()) for name in names)
+            for key, (edited, when, zhash, row) in winners.items():
+                wanted.setdefault(side.PART_DIR + side.bucket(when), RowArray()).append(row)
+            changed = dict()
+            for name in wanted:
+                if name not in parts:
+                    parts[name] = side.read(name) # A row that was archived in the wrong bucket.
+                if TimePartitions.Digest(parts[name]) != TimePartitions.Digest(wanted[name]):
+                    changed[name] = wanted[name]
+            if changed and side.replace(changed, now) is False:
+                return False
+            have = ArchiveSync._Hashes(parts)
+            results.append(sum(1 for key in winners if have.get(key) != winners[key][2]))
+        for side in self._sides:
+            if side.mark_synced() is False:
+                return False
+        return tuple(results)
+
+
+if __name__ == '__main__':
+    import tempfile
+    from ZipNotes.Row import RowOne
+    from ZipNotes.ZipBase import ZipArchiveBase
+    day = 24 * 60 * 60
+    now = 1700000000
+    with tempfile.TemporaryDirectory() as folder:
+        laptop = TimePartitions(ZipArchiveBase(os.path.join(folder, 'laptop.zdb')))
+        server = TimePartitions(ZipArchiveBase(os.path.join(folder, 'server.zdb')))
+        db = RowArray()
+        for ss in range(60):
+            row = RowOne(time=now - ss * 5 * day)
+            row.subject = "Row %d" % ss
+            db.append(row)
+        assert(laptop.save(db, now=now))
+        assert(server.save(db, now=now))
+        sync = ArchiveSync(laptop, server)
+        assert(sync.differing() == [])
+        assert(sync.run(now=now) == (0, 0))
+        # Each side changes a little:
+        keys = list(db.get_subjects())
+        mine = RowArray.FromString(RowArray.ToString(db))
+        theirs = RowArray.FromString(RowArray.ToString(db))
+        added = mine.create()
+        added.time = now
+        edited = mine.lookup(keys[10])
+        edited.subject = "Laptop"
+        edited.time = now - 49 * day
+        moved = theirs.lookup(keys[50])
+        moved.subject = "Server"
+        moved.time = now - 1 * day             # Moves to the latest bucket.
+        conflict_mine = mine.lookup(keys[20])
+        conflict_mine.subject = "Older"
+        conflict_mine.time = now - 99 * day
+        conflict_theirs = theirs.lookup(keys[20])
+        conflict_theirs.subject = "Newer"
+        conflict_theirs.time = now - 98 * day
+        laptop.save(mine, now=now)
+        server.save(theirs, now=now)
+        differing = sync.differing()
+        assert(0 < len(differing) < len(laptop.manifest()))
+        plan = sync.plan()
+        assert(plan == (sorted([moved.id, conflict_theirs.id]), sorted([added.id, edited.id])))
+        assert(sync.run(now=now) == (2, 2))
+        assert(sync.differing() == [])
+        assert(sync.run(now=now) == (0, 0))
+        for side in (laptop, server):
+            rows = side.scan()
+            assert(rows.count() == 61)
+            assert(rows.lookup(added.id) is not None)
+            assert(rows.lookup(edited.id).subject == "Laptop")
+            assert(rows.lookup(moved.id).subject == "Server")
+            assert(rows.lookup(conflict_mine.id).subject == "Newer")
+        # Edits that keep the row's time sync, too:
+        mine = laptop.scan()
+        edited = mine.lookup(keys[30])
+        edited.subject = "Edited in place"
+        assert(mine.update(edited))
+        laptop.save(mine, now=now)
+        assert(len(sync.differing()) == 1)
+        assert(sync.run(now=now) == (0, 1))
+        assert(server.scan().lookup(edited.id).subject == "Edited in place")
+        for ss in range(8):                    # ...whichever the side, and hash.
+            side = (laptop, server)[ss % 2]
+            rows = side.scan()
+            zrow = rows.lookup(keys[ss])
+            zrow.subject = "In place %d" % ss
+            rows.update(zrow)
+            side.save(rows, now=now)
+            assert(sync.run(now=now) == ((0, 1), (1, 0))[ss % 2])
+            assert((laptop, server)[1 - ss % 2].scan().lookup(keys[ss]).subject == "In place %d" % ss)
+        # Equal times, with different content, resolve the same on both sides:
+        mine, theirs = laptop.scan(), server.scan()
+        for rows, subject in ((mine, "Laptop tie"), (theirs, "Server tie")):
+            zrow = rows.lookup(keys[40])
+            zrow.subject = subject
+            rows.update(zrow)
+        laptop.save(mine, now=now)
+        server.save(theirs, now=now)
+        assert(sorted(sync.run(now=now)) == [0, 1])
+        assert(sync.differing() == [])
+        tie = laptop.scan().lookup(keys[40]).subject
+        assert(tie in ("Laptop tie", "Server tie") and server.scan().lookup(keys[40]).subject == tie)
+        # Each side edits a different row of the same bucket - both edits survive:
+        mine, theirs = laptop.scan(), server.scan()
+        name = laptop.PART_DIR + laptop.bucket(mine.lookup(keys[41]).time)
+        assert(laptop.bucket(mine.lookup(keys[42]).time) == laptop.bucket(mine.lookup(keys[41]).time))
+        for rows, key, subject in ((mine, keys[41], "Laptop only"), (theirs, keys[42], "Server only")):
+            zrow = rows.lookup(key)
+            zrow.subject = subject
+            rows.update(zrow)
+        laptop.save(mine, now=now)
+        server.save(theirs, now=now)
+        assert(sync.differing() == [name])
+        assert(sync.run(now=now) == (1, 1))
+        for side in (laptop, server):
+            rows = side.scan()
+            assert(rows.lookup(keys[41]).subject == "Laptop only")
+            assert(rows.lookup(keys[42]).subject == "Server only")
+        try:
+            ArchiveSync(laptop, TimePartitions(server.archive, bucket='year'))
+            raise Exception("Error: Bucket sizes must match.")
+        except ValueError:
+            pass
+    print("Testing Success")
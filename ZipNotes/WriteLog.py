@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+
+# Mission: Opportunity to make every RowArray edit durable, without either
+# re-creating the archive, or paying for an fsync, upon every edit. Edits
+# are appended to a write-ahead log, synced in groups, then checkpointed
+# into the archive. Opening the archive replays whatever the log holds.
+
+# Status: Testing Success
+# Date Created: 2026-10-19
+
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+import struct
+import threading
+import time
+import zlib
+
+from ZipNotes.Row import RowOne
+from ZipNotes.RowArray import RowArray
+from ZipNotes.Codecs import BinSerializer
+from ZipNotes.Delta import Delta
+
+class WriteAheadLog:
+
+    '''
+    An append-only file of framed (length, crc32, payload) records. Records
+    are synced in groups: once "window_bytes" are pending, else "window_secs"
+    after the first pending record. Reading stops at the first torn record,
+    as left by a crash.
+    '''
+
+    FRAME = struct.Struct('>II')
+
+    def __init__(self, file, window_secs=0.05, window_bytes=65536):
+        self._file = file
+        self._window_secs = window_secs
+        self._window_bytes = window_bytes
+        self._lock = threading.RLock()
+        self._timer = None
+        self._pending = 0
+        self._fh = open(file, 'ab')
+        self._valid = self._scan()
+        if self._valid != os.path.getsize(file):
+            self._fh.truncate(self._valid)  # Drop any torn record.
+
+    @property
+    def file(self):
+        ''' Query the log file-name. '''
+        return self._file
+
+    def size(self):
+        ''' The number of bytes logged. '''
+        with self._lock:
+            return self._fh.tell()
+
+    def _scan(self):
+        pos = 0
+        for record, pos in self._records():
+            pass
+        return pos
+
+    def _records(self):
+        ''' Yield each valid (record, end position). '''
+        pos = 0
+        with open(self._file, 'rb') as fh:
+            data = fh.read()
+        while pos + WriteAheadLog.FRAME.size <= len(data):
+            size, crc = WriteAheadLog.FRAME.unpack_from(data, pos)
+            start = pos + WriteAheadLog.FRAME.size
+            payload = data[start:start + size]
+            if len(payload) != size or zlib.crc32(payload) != crc:
+                break
+            pos = start + size
+            yield BinSerializer.loads(payload), pos
+
+    def records(self):
+        ''' Iterate over every valid record. '''
+        with self._lock:
+            self._fh.flush()
+            for record, pos in self._records():
+                yield record
+
+    @staticmethod
+    def Frame(record):
+        payload = BinSerializer.dumps(record)
+        return WriteAheadLog.FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def append(self, record):
+        ''' Log a record (any BinSerializer value.) The record is durable once
+        its group has been committed. '''
+        frame = WriteAheadLog.Frame(record)
+        with self._lock:
+            self._fh.write(frame)
+            self._pending += len(frame)
+            if self._pending >= self._window_bytes or not self._window_secs:
+                self.commit()
+            elif not self._timer:
+                self._timer = threading.Timer(self._window_secs, self.commit)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def commit(self):
+        ''' Sync every pending record, as a group. '''
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending or not self._fh:
+                return
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._pending = 0
+
+    def truncate(self):
+        ''' Empty the log - as when all records have been checkpointed. '''
+        with self._lock:
+            self.commit()
+            self._fh.truncate(0)
+            self._fh.seek(0)
+            os.fsync(self._fh.fileno())
+
+    def rewrite(self, records):
+        ''' Replace the log with the records given, as one synced write. A crash
+        leaves either the prior log, or the new one. '''
+        with self._lock:
+            self.commit()
+            tmp = self._file + '.tmp'
+            with open(tmp, 'wb') as fh:
+                for record in records:
+                    fh.write(WriteAheadLog.Frame(record))
+                fh.flush()
+                os.fsync(fh.fileno())
+            self._fh.close()
+            os.replace(tmp, self._file)
+            self._fh = open(self._file, 'ab')
+
+    def close(self):
+        with self._lock:
+            if self._fh:
+                self.commit()
+                self._fh.close()
+                self._fh = None
+
+
+class LoggedRowArray(RowArray):
+
+    '''
+    A RowArray, saved to an archive (ZipArchiveBase) file, whose every create,
+    append, update, delete, pack, and clear is first written to a log
+    (archive + ".wal".) Use .open() to load the archive and replay the log,
+    and .checkpoint() to fold the log into the archive. Checkpoints also
+    happen automatically, once the log reaches "checkpoint_bytes". Updates
+    are logged as deltas from the row's prior logged version, with a full
+    copy every KEYFRAME-th update. With a ChangeFeed attached, each record
+    also carries its published change, and checkpoints keep the retained
+    changes in the log. Every checkpoint also logs the latest change number,
+    feed or no feed, so that numbering never restarts.
+    '''
+
+    LOG_TYPE = ".wal"
+    CHECKPOINT_BYTES = 4 * 1024 * 1024
+    KEYFRAME = 16
+
+    def __init__(self, archive, file="ZibDB.txt", checkpoint_bytes=None, **window):
+        super().__init__()
+        self._archive = archive
+        self._member = file
+        self._checkpoint_bytes = checkpoint_bytes if checkpoint_bytes else LoggedRowArray.CHECKPOINT_BYTES
+        self._log = WriteAheadLog(archive.file + LoggedRowArray.LOG_TYPE, **window)
+        self._replaying = False
+        self._change = None # The change published for the edit being logged.
+        self._retained = 0 # Log bytes kept by the last checkpoint (retained changes.)
+        self._unreadable = False # The archived rows could not be read: never checkpoint over them.
+        self._seq = 0 # The latest change number logged.
+        self._shadow = dict() # id: [prior logged row-dictionary, deltas since the keyframe]
+
+    @property
+    def log(self):
+        ''' Query the write-ahead log. '''
+        return self._log
+
+    def open(self):
+        ''' Load the archived rows, then replay the log. Returns the number of
+        records replayed. False if the archive holds rows that cannot be read
+        (a corrupt file, or a missing / wrong cipher) - after which .checkpoint()
+        refuses to overwrite them. '''
+        self._db.clear()
+        self._unreadable = False
+        if self._archive.exists():
+            try:
+                archived = self._member in self._archive.list()
+            except Exception:
+                archived = True
+            if archived:
+                rows = RowArray.FromString(self._archive.read_archive(self._member))
+                if rows is False:
+                    self._unreadable = True
+                    return False
+                self._db = rows._db
+        tally = 0
+        self._seq = 0
+        self._replaying = True
+        try:
+            for record in self._log.records():
+                if record[0] == 'seq':
+                    self._seq = max(self._seq, record[3])
+                    continue
+                if len(record) > 3:
+                    self._seq = max(self._seq, record[3][0])
+                if record[0] != 'feed':
+                    self._replay(*record[:3])
+                    tally += 1
+        finally:
+            self._replaying = False
+        return tally
+
+    def _replay(self, op, key, value):
+        if op in ('create', 'append', 'update'):
+            self._db[key] = RowOne.FromString(value)
+        elif op == 'delta':
+            self._db[key] = RowOne.FromString(Delta.ApplyRow(dict(self._db[key]._data), value))
+        elif op == 'delete':
+            self._db[key] = None
+        elif op == 'pack':
+            super().pack()
+        elif op == 'clear':
+            super().clear()
+
+    def _changed(self, op, row=None):
+        ''' Keep the published change, for the log record of this same edit. '''
+        if self._feed and not self._replaying:
+            self._change = self._feed.publish(op, row)
+
+    def _logged(self, op, row=None):
+        change, self._change = self._change, None
+        if self._replaying:
+            return
+        if row is None:
+            self._shadow.clear()
+            record = [op, None, None]
+        elif op == 'delete':
+            self._shadow.pop(row.id, None)
+            record = [op, row.id, None]
+        else:
+            new = dict(row._data)
+            shadow = self._shadow.get(row.id)
+            delta = None
+            if op == 'update' and shadow and shadow[1] < LoggedRowArray.KEYFRAME:
+                delta = Delta.MakeRow(shadow[0], new)
+                if not LoggedRowArray.IsPortable(delta['set']):
+                    delta = None # Log the full (repr) row instead.
+            if delta is not None:
+                self._shadow[row.id] = [new, shadow[1] + 1]
+                record = ['delta', row.id, delta]
+            else:
+                self._shadow[row.id] = [new, 0]
+                record = [op, row.id, RowOne.ToString(row)]
+        if change:
+            record.append(list(change)) # One record: the edit & its change are durable together.
+            self._seq = change[0]
+        self._log.append(record)
+        if self._log.size() - self._retained >= self._checkpoint_bytes:
+            self.checkpoint()
+
+    @staticmethod
+    def IsPortable(value):
+        ''' True when BinSerializer round-trips a value exactly. Sets, tuples,
+        and the like are not: deltas holding those are logged as full rows. '''
+        if value is None or type(value) in (bool, int, float, str, bytes):
+            return True
+        if type(value) == list:
+            return all(LoggedRowArray.IsPortable(item) for item in value)
+        if type(value) == dict:
+            return all(LoggedRowArray.IsPortable(key) and LoggedRowArray.IsPortable(value[key])
+                       for key in value)
+        return False
+
+    def checkpoint(self):
+        ''' Fold the log into the archive, then empty the log. False on error -
+        in which case the log is retained. '''
+        self._log.commit()
+        if self._unreadable:
+            return False
+        if not self._archive.archive_replace(RowArray.IterString(self), self._member):
+            return False
+        seq = max(self._seq, self._feed.seq if self._feed else 0)
+        if seq:
+            records = [['seq', None, None, seq]]
+            if self._feed:
+                changes = self._feed.changes(self._feed.first - 1)
+                records.extend(['feed', None, None, list(change)] for change in changes)
+            self._log.rewrite(records)
+        else:
+            self._log.truncate()
+        self._retained = self._log.size()
+        self._shadow.clear() # Deltas never span a checkpoint.
+        return True
+
+    def commit(self):
+        ''' Sync any pending log records now. '''
+        self._log.commit()
+
+    def close(self):
+        ''' Sync the log. Use .checkpoint() first to also update the archive. '''
+        self._log.close()
+
+    def clear(self):
+        super().clear()
+        self._logged('clear')
+
+    def pack(self):
+        super().pack()
+        self._logged('pack')
+
+    def create(self):
+        result = super().create()
+        self._logged('create', result)
+        return result
+
+    def append(self, row, unique=False):
+        if not super().append(row, unique):
+            return False
+        self._logged('append', row)
+        return True
+
+    def update(self, row):
+        if not super().update(row):
+            return False
+        self._logged('update', row)
+        return True
+
+    def delete(self, row):
+        if not super().delete(row):
+            return False
+        self._logged('delete', row)
+        return True
+
+
+if __name__ == '__main__':
+    import tempfile
+    from ZipNotes.ZipBase import ZipArchiveBase
+    with tempfile.TemporaryDirectory() as folder:
+        archive = ZipArchiveBase(os.path.join(folder, 'wal.zdb'))
+        db = LoggedRowArray(archive, window_secs=10, window_bytes=1 << 20)
+        assert(db.open() == 0)
+        rows = list()
+        for ss in range(10):
+            row = db.create()
+            row.subject = "Row %d" % ss
+            assert(db.update(row))
+            rows.append(row)
+        assert(db.delete(rows[0]))
+        db.commit()
+        assert(archive.exists() == False)
+        # A "crash" - the archive was never written, so the log has it all:
+        db2 = LoggedRowArray(archive)
+        assert(db2.open() == 21)
+        assert(db2.count() == 9 and db2.count_deleted() == 1)
+        assert(db2.lookup(rows[5].id).subject == "Row 5")
+        # A torn record is ignored:
+        db.close()
+        with open(archive.file + LoggedRowArray.LOG_TYPE, 'ab') as fh:
+            fh.write(b'\x00\x00\x01\x00torn')
+        db2.close()
+        db2 = LoggedRowArray(archive)
+        assert(db2.open() == 21)
+        # Checkpoints fold the log into the archive:
+        db2.pack()
+        assert(db2.checkpoint())
+        assert(db2.log.size() == 0)
+        assert(RowArray.FromString(archive.read_archive("ZibDB.txt")).count() == 9)
+        rows[9].subject = "Changed"
+        assert(db2.update(rows[9]))
+        db2.close()
+        db3 = LoggedRowArray(archive)
+        assert(db3.open() == 1)
+        assert(db3.count() == 9)
+        assert(db3.lookup(rows[9].id).subject == "Changed")
+        # Edits are logged as deltas:
+        rows[9].data = "Lorem ipsum dolor sit amet. " * 4000
+        assert(db3.update(rows[9]))
+        size = db3.log.size()
+        for ss in range(LoggedRowArray.KEYFRAME + 1):
+            rows[9].data = rows[9].data[:ss * 10] + "Edit %d. " % ss + rows[9].data[ss * 10:]
+            assert(db3.update(rows[9]))
+            if ss == 0:
+                assert(db3.log.size() - size < 200)
+        assert(db3.log.size() - size > len(rows[9].data))  # The keyframe.
+        db3.close()
+        db3 = LoggedRowArray(archive)
+        assert(db3.open() == 3 + LoggedRowArray.KEYFRAME)
+        assert(db3.lookup(rows[9].id).data == rows[9].data)
+        # Values that a delta cannot carry are logged in full:
+        rows[8].set('tags', {"red", "blue"})
+        rows[8].set('span', (1, 2))
+        assert(db3.update(rows[8]))
+        rows[8].set('tags', {"red"})
+        rows[8].set('span', (3, 4))
+        assert(db3.update(rows[8]))
+        rows[8].subject = "Portable"
+        assert(db3.update(rows[8]))
+        assert(list(db3.log.records())[-1][0] == 'delta')
+        db3.close()
+        db3 = LoggedRowArray(archive)
+        assert(db3.open() == 6 + LoggedRowArray.KEYFRAME)
+        assert(db3.lookup(rows[8].id).get('tags') == {"red"})
+        assert(db3.lookup(rows[8].id).get('span') == (3, 4))
+        assert(db3.lookup(rows[8].id).subject == "Portable")
+        assert(db3.checkpoint())
+        # Logs can be rewritten:
+        db3.log.rewrite([['create', 'x', None], ['delete', 'x', None]])
+        assert(list(db3.log.records()) == [['create', 'x', None], ['delete', 'x', None]])
+        db3.log.append(['clear', None, None])
+        assert(len(list(db3.log.records())) == 3)
+        db3.log.truncate()
+        db3.close()
+        # Group commits happen upon the time window, as well:
+        db4 = LoggedRowArray(archive, window_secs=0.01)
+        db4.open()
+        db4.create()
+        time.sleep(0.1)
+        assert(db4.log._pending == 0)
+        # ...as do automatic checkpoints:
+        db4._checkpoint_bytes = 1
+        db4.create()
+        assert(db4.log.size() == 0)
+        assert(RowArray.FromString(archive.read_archive("ZibDB.txt")).count() == 11)
+        db4.close()
+        # Unreadable rows are never replaced by the log alone:
+        archive.archive_replace("Not a RowArray", "ZibDB.txt")
+        db5 = LoggedRowArray(archive)
+        assert(db5.open() == False)
+        db5.create()
+        assert(db5.checkpoint() == False)
+        assert(archive.read_archive("ZibDB.txt") == "Not a RowArray")
+        db5.close()
+        db6 = LoggedRowArray(archive, file="Other.txt")
+        assert(db6.open() == 1)  # A missing file is simply empty - plus the create logged above.
+        assert(db6.checkpoint())
+        db6.close()
+    print("Testing Success")
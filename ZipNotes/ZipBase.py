@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 
-from zipfile import ZipFile
+import time
+import warnings
+from zipfile import ZipFile, ZipInfo, ZIP_STORED
 
 import os
 import sys
-sys.path.insert(1, os.path.join(sys.path[0], '../..'))
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from ZipNotes.Metrics import REGISTRY
+from ZipNotes.Codecs import Codec
 
 class ZipArchiveBase():
 
@@ -14,15 +19,24 @@ class ZipArchiveBase():
     any updatable file content.
     '''
 
-    def __init__(self, archive_file="Enigma.zip"):
-        ''' Define an archive file. '''
+    SYSTEM = ["blobs/", "_index/", "_parts/", "history/", "_schema/"] # Archived file prefixes that never hold rows.
+
+    def __init__(self, archive_file="Enigma.zip", codec=None):
+        ''' Define an archive file. The codec (see Codecs.Codec) is used to encode
+        what we archive. Reading uses whatever codec each file was archived with. '''
         self._file = archive_file
+        self._codec = codec if codec else Codec()
 
     @property
     def file(self):
         ''' Query the archive file-name. '''
         return self._file
 
+    @property
+    def codec(self):
+        ''' Query the codec used for archiving. '''
+        return self._codec
+
 
     def destroy(self):
         ''' Destroy any existing archive file. True when archive no longer exists.
@@ -47,17 +61,66 @@ class ZipArchiveBase():
             return False
 
 
-    def _en(self, string):
+    def _en(self, message, codec=None, aad=b''):
         ''' Encoding can present several opportunites. Here we are
-        simply converting an archive payload to bytes. '''
-        return bytes(string, 'utf-8')
+        converting an archive payload to bytes, using the codec. Strings
+        are UTF-8 (plus any pre-compression), bytes are archived as-is. '''
+        if not codec:
+            codec = self._codec.For(message)
+        return codec.encode(message, aad)
 
 
-    def _de(self, string):
+    def _de(self, string, codec=None, aad=b''):
         ''' Decoding can present several opportunites. Here we are
-        simply converting our previously encoded bytes, back to a Unicode
-        string. '''
-        return str(string, 'utf-8')
+        converting our previously encoded bytes back to a Unicode string,
+        bytes, or whatever else the codec had archived. '''
+        if not codec:
+            codec = Codec('text')
+        return codec.decode(string, aad)
+
+
+    @staticmethod
+    def Aad(file, tag):
+        ''' The associated data that binds an encrypted file to its name, and
+        codec tag: sealed content cannot be swapped between files. '''
+        return bytes(file, 'utf-8') + b'\x00' + bytes(tag)
+
+
+    def _write(self, zZip, message, file, compress_type=None):
+        ''' Archive a message, recording the codec used in the file's comment.
+        Re-archiving a file name supersedes the prior file, until .compact().
+        A message can also be an iterator of str (or bytes) chunks, each of
+        which is encoded and written as it arrives. '''
+        stream = ZipArchiveBase.IsStream(message)
+        if stream:
+            first = next(message, '')
+            codec = self._codec.For(first)
+        else:
+            codec = self._codec.For(message)
+        info = ZipInfo(file, time.localtime(time.time())[:6])
+        info.compress_type = zZip.compression if compress_type is None else compress_type
+        if codec.cipher and compress_type is None:
+            info.compress_type = ZIP_STORED # Ciphertext will not compress.
+        info.comment = codec.tag()
+        aad = ZipArchiveBase.Aad(file, info.comment) if codec.cipher else b''
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', 'Duplicate name')
+            if not stream:
+                with zZip.open(info, 'w') as fh:
+                    fh.write(self._en(message, codec, aad)) # Also: .writestr()
+                return
+            encoder = codec.encoder(aad)
+            with zZip.open(info, 'w', force_zip64=True) as fh:
+                fh.write(encoder.update(first))
+                for chunk in message:
+                    fh.write(encoder.update(chunk))
+                fh.write(encoder.flush())
+
+
+    @staticmethod
+    def IsStream(message):
+        ''' Check to see if a message is an iterator of chunks (such as a generator.) '''
+        return hasattr(message, '__next__')
 
 
     def list(self):
@@ -66,45 +129,207 @@ class ZipArchiveBase():
             return zZip.namelist()
 
 
+    def row_files(self):
+        ''' List each contained file that might hold rows - once, no matter how
+        many times it has been re-archived. '''
+        results = list()
+        for name in dict.fromkeys(self.list()):
+            if not ZipArchiveBase.IsSystem(name):
+                results.append(name)
+        return results
+
+
+    @staticmethod
+    def IsSystem(name):
+        ''' Check to see if a contained file is reserved for our own use. '''
+        for prefix in ZipArchiveBase.SYSTEM:
+            if name.startswith(prefix):
+                return True
+        return False
+
+
     def read_archive(self, file):
-        ''' Read a previously archived file, by name. Use list() to query archive content. '''
+        ''' Read a previously archived file, by name. Use list() to query archive content.
+        With a cipher, files that were not encrypted are refused (False), as anyone
+        could have added them. '''
         try:
-            with ZipFile(self._file, 'r') as zZip:
-                with zZip.open(file) as fh:
-                    return self._de(fh.read())
+            with REGISTRY.timer('zip.open'):
+                zZip = ZipFile(self._file, 'r')
+            with zZip:
+                info = zZip.getinfo(file)
+                codec = Codec.FromTag(info.comment, self._codec.cipher)
+                if self._codec.cipher and not codec.cipher:
+                    return False
+                with REGISTRY.timer('zip.read'):
+                    with zZip.open(file) as fh:
+                        if codec.cipher:
+                            aad = ZipArchiveBase.Aad(file, info.comment)
+                            payload = ZipArchiveBase._Decrypt(fh, codec.cipher, aad)
+                            codec = Codec(codec.serializer, codec.compressor)
+                        else:
+                            payload = fh.read()
+                if REGISTRY.enabled:
+                    REGISTRY.add('zip.read.compressed', info.compress_size)
+                    REGISTRY.add('zip.read.uncompressed', info.file_size)
+            with REGISTRY.timer('zip.decode'):
+                return self._de(payload, codec)
         except Exception as ex:
             return False
 
 
-    def archive_first(self, message, file, overwrite=False):
+    @staticmethod
+    def _Decrypt(fh, cipher, aad):
+        ''' Decrypt an archived file as it is read. '''
+        zobj = cipher.decryptor(aad)
+        results = list()
+        while True:
+            chunk = fh.read(cipher.CHUNK)
+            if not chunk:
+                break
+            results.append(zobj.update(chunk))
+        results.append(zobj.flush())
+        return b''.join(results)
+
+
+    def archive_first(self, message, file, overwrite=False, compress_type=None):
         ''' Our strategy will not create an empty archive. Neither will we allow an archive
-        to be accidently overwritten. '''
+        to be accidently overwritten. An overwritten archive is only replaced once the
+        new one has been completely written, so a crash never leaves it truncated. '''
         try:
             if not overwrite and self.exists():
                 return False
-            with ZipFile(self._file, 'w') as zZip:
-                with zZip.open(file, 'w') as fh:
-                    fh.write(self._en(message)) # Also: .writestr()
-                if zZip.testzip() is None:
-                    return True
+            tmp = self._file + '.tmp'
+            with REGISTRY.timer('zip.write'):
+                with ZipFile(tmp, 'w') as zZip:
+                    self._write(zZip, message, file, compress_type)
+                    self._count_write(zZip, file)
+                    bOkay = zZip.testzip() is None
+                return self._commit(tmp, bOkay)
         except Exception as ex:
             raise ex
         return False
 
 
-    def archive_next(self, message, file):
-        ''' Once created via .archive_first() we can add more files to the archive. '''
+    def archive_next(self, message, file, compress_type=None):
+        ''' Once created via .archive_first() we can add more files to the archive.
+        Use compress_type (e.g. zipfile.ZIP_LZMA) to override the ZIP compression. '''
         try:
-            with ZipFile(self._file, 'a') as zZip:
-                with zZip.open(file, 'w') as fh:
-                    fh.write(self._en(message))
-                if zZip.testzip() is None:
-                    return True
+            with REGISTRY.timer('zip.write'):
+                with ZipFile(self._file, 'a') as zZip:
+                    self._write(zZip, message, file, compress_type)
+                    self._count_write(zZip, file)
+                    if zZip.testzip() is None:
+                        return True
         except Exception as ex:
             pass
         return False
 
 
+    def archive_batch(self, members, compress_type=None):
+        ''' Archive several (message, file) pairs in one go: the archive is opened
+        once, and only the files written are verified. A member can also be a
+        (message, file, compress_type) triple. Creates the archive, as required.
+        False on error. '''
+        members = [tuple(member) + (compress_type,) * (3 - len(member)) for member in members]
+        if not members:
+            return True
+        if not self.exists():
+            message, file, ztype = members.pop(0)
+            if not self.archive_first(message, file, compress_type=ztype):
+                return False
+        try:
+            with REGISTRY.timer('zip.write'):
+                with ZipFile(self._file, 'a') as zZip:
+                    first = len(zZip.infolist())
+                    for message, file, ztype in members:
+                        self._write(zZip, message, file, ztype)
+                        self._count_write(zZip, file)
+                return self._verify(first)
+        except Exception as ex:
+            pass
+        return False
+
+
+    def _verify(self, first=0):
+        ''' Check the CRC of every archived file, from the "first" (by position) onward. '''
+        with ZipFile(self._file, 'r') as zZip:
+            for info in zZip.infolist()[first:]:
+                with zZip.open(info) as fh:
+                    while fh.read(1 << 20):
+                        pass
+        return True
+
+
+    def superseded(self):
+        ''' The number of archived copies superseded by a later copy - as
+        .compact() would remove. '''
+        try:
+            names = self.list()
+        except Exception:
+            return 0
+        return len(names) - len(set(names))
+
+
+    def archive_replace(self, message, file):
+        ''' Re-create the archive with a new copy of a file, keeping the latest copy
+        of every other file. The prior archive is only replaced once the new
+        one has been completely written. '''
+        if not self.exists():
+            return self.archive_first(message, file)
+        return self._rewrite(lambda name: name != file, message, file)
+
+
+    def compact(self, keep=None):
+        ''' Re-create the archive, keeping only the latest copy of each file.
+        Use keep(name) to choose which files survive. The prior archive is
+        only replaced once the new one has been completely written. '''
+        if not self.exists():
+            return False
+        return self._rewrite(keep)
+
+
+    def _rewrite(self, keep, message=None, file=None):
+        tmp = self._file + '.tmp'
+        try:
+            with REGISTRY.timer('zip.rewrite'):
+                with ZipFile(self._file, 'r') as zSrc:
+                    latest = dict()
+                    for info in zSrc.infolist():
+                        latest[info.filename] = info
+                    with ZipFile(tmp, 'w') as zDst:
+                        for name in latest:
+                            if keep and not keep(name):
+                                continue
+                            zDst.writestr(latest[name], zSrc.read(latest[name]))
+                        if file:
+                            self._write(zDst, message, file)
+                return self._commit(tmp, True)
+        except Exception as ex:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            return False
+
+
+    def _commit(self, tmp, bOkay):
+        ''' Sync a completely written temporary archive, then move it into place. '''
+        if not bOkay:
+            os.unlink(tmp)
+            return False
+        with open(tmp, 'rb') as fh:
+            os.fsync(fh.fileno())
+        os.replace(tmp, self._file)
+        return True
+
+
+    @staticmethod
+    def _count_write(zZip, file):
+        ''' Report the bytes written for an archived file, when instrumented. '''
+        if REGISTRY.enabled:
+            info = zZip.getinfo(file)
+            REGISTRY.add('zip.write.compressed', info.compress_size)
+            REGISTRY.add('zip.write.uncompressed', info.file_size)
+
+
     @staticmethod
     def TestCase(test, cleanup=True):
         ''' Re-usable test case for child classes. '''
@@ -145,4 +370,83 @@ class ZipArchiveBase():
 if __name__ == "__main__":
     test = ZipArchiveBase()
     ZipArchiveBase.TestCase(test)
+
+    # Codecs are recorded per file, so mixed archives remain readable:
+    zvalue = [{'id': 'one', 'time': 1}, {'id': 'two', 'data': 'x' * 1000}]
+    for codec in (Codec('json', 'zlib'), Codec('bin'), Codec('repr', 'auto')):
+        test = ZipArchiveBase(codec=codec)
+        ZipArchiveBase.TestCase(test, cleanup=False)
+        assert(test.archive_next(zvalue, "rows.dat"))
+        assert(test.read_archive("rows.dat") == zvalue)
+        assert(test.archive_next(b"\x00\xff", "raw.bin"))
+        assert(test.read_archive("raw.bin") == b"\x00\xff")
+        legacy = ZipArchiveBase()
+        assert(legacy.read_archive("rows.dat") == zvalue)
+        assert(test.archive_next("Superseded", "rows.dat"))
+        assert(test.read_archive("rows.dat") == "Superseded")
+        assert(len(test.list()) == 8)
+        assert(test.compact(keep=lambda name: name != "raw.bin"))
+        assert(len(test.list()) == 6)
+        assert(test.read_archive("rows.dat") == "Superseded")
+        assert(test.read_archive("raw.bin") == False)
+        assert(test.archive_next(iter(["Str", "eam", "ed"]), "stream.txt"))
+        assert(test.read_archive("stream.txt") == "Streamed")
+        assert(test.archive_replace(iter([b"\x00", b"\xff"]), "stream.txt"))
+        assert(test.read_archive("stream.txt") == b"\x00\xff")
+        assert(test.archive_next("Discarded", "stream.txt"))
+        assert(test.compact(keep=lambda name: name != "stream.txt"))
+        assert(test.archive_replace("Replaced", "rows.dat"))
+        assert(test.read_archive("rows.dat") == "Replaced")
+        assert(len(test.list()) == 6)
+        assert(test.archive_batch([("One", "batch1.txt"), (zvalue, "batch2.dat")]))
+        assert(test.read_archive("batch1.txt") == "One" and test.read_archive("batch2.dat") == zvalue)
+        assert(test.archive_batch([]))
+        assert(test.superseded() == 0)
+        assert(test.archive_batch([("Two", "batch1.txt", ZIP_STORED)]))
+        assert(test.superseded() == 1)
+        assert(legacy.read_archive("MyFile.dat") == "Test Pattern\n\r\noNe!")
+        assert(test.destroy())
+
+    # Encrypted files need the passphrase, plain files do not:
+    from ZipNotes.Codecs import AESGCM, Cipher
+    if AESGCM:
+        from zipfile import ZIP_DEFLATED
+        cipher = Cipher("Sesame")
+        test = ZipArchiveBase(codec=Codec('bin', 'zlib', cipher))
+        ZipArchiveBase.TestCase(test, cleanup=False)
+        zlarge = "Secret " * 50000
+        assert(test.archive_next(zlarge, "large.txt"))
+        assert(test.read_archive("large.txt") == zlarge)
+        assert(test.archive_next(iter(["Sec", "ret"]), "stream.txt"))
+        assert(test.read_archive("stream.txt") == "Secret")
+        assert(test.archive_next(zvalue, "rows.dat", compress_type=ZIP_DEFLATED))
+        assert(test.read_archive("rows.dat") == zvalue)
+        with open(test.file, 'rb') as fh:
+            assert(b"Secret" not in fh.read())
+        with ZipFile(test.file) as zZip:
+            assert(zZip.getinfo("large.txt").compress_type == ZIP_STORED)
+        assert(ZipArchiveBase(test.file).read_archive("large.txt") == False)
+        assert(ZipArchiveBase(test.file, Codec(cipher=Cipher("Wrong"))).read_archive("large.txt") == False)
+        assert(ZipArchiveBase(test.file, Codec(cipher=Cipher("Sesame"))).read_archive("large.txt") == zlarge)
+        assert(test.compact())
+        assert(test.read_archive("large.txt") == zlarge)
+        # Sealed content cannot be swapped between files:
+        assert(test.archive_next("Alpha", "a.txt") and test.archive_next("Beta", "b.txt"))
+        swapped = test.file + '.swap'
+        with ZipFile(test.file) as zSrc, ZipFile(swapped, 'w') as zDst:
+            latest = dict((info.filename, info) for info in zSrc.infolist())
+            payloads = dict((name, zSrc.read(latest[name])) for name in latest)
+            for name in latest:
+                other = {"a.txt": "b.txt", "b.txt": "a.txt"}.get(name, name)
+                zDst.writestr(latest[name], payloads[other])
+        zswap = ZipArchiveBase(swapped, test.codec)
+        assert(zswap.read_archive("a.txt") == False and zswap.read_archive("b.txt") == False)
+        assert(zswap.read_archive("large.txt") == zlarge)
+        assert(zswap.destroy())
+        # ...nor can plain content be slipped in:
+        assert(ZipArchiveBase(test.file).archive_next("Forged", "a.txt"))
+        assert(test.read_archive("a.txt") == False)
+        assert(ZipArchiveBase(test.file).read_archive("a.txt") == "Forged")
+        assert(test.destroy())
+    print("Testing Success")
         
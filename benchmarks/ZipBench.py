@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+
+# Mission: Opportunity to measure the RowOne, RowArray, and ZipArchiveBase
+# hot paths - without a GUI - so as to catch regressions before we deploy.
+
+# Status: Testing Success
+# Date Created: 2026-10-19
+
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+import json
+import shutil
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+
+from ZipNotes.Row import RowOne
+from ZipNotes.RowArray import RowArray
+from ZipNotes.ZipBase import ZipArchiveBase
+from ZipNotes.Codecs import Codec, Cipher, COMPRESSORS, AESGCM
+from ZipNotes.BlobStore import BlobStore
+from ZipNotes.PageStore import PagedRowArray
+from ZipNotes.WriteLog import LoggedRowArray
+from ZipNotes.IdIndex import IdIndex
+from ZipNotes.RowCache import RowCache
+from ZipNotes.Session import LastSession
+from ZipNotes.ChangeFeed import ChangeFeed
+from ZipNotes.Partition import TimePartitions
+from ZipNotes.Sync import ArchiveSync
+from ZipNotes.Schema import FieldSchema
+
+CASES = OrderedDict()
+
+def case(name):
+    ''' Register a benchmark. The decorated function receives the scale (row count)
+    as well as a scratch folder, and returns the (operation, iterations) to time.
+    An optional third item, a dictionary, is added to the results. '''
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+def make_rows(scale, payload=64):
+    ''' Create a RowArray of "scale" rows, each sporting a "payload" sized data. '''
+    rows = RowArray()
+    for ss in range(scale):
+        row = rows.create()
+        row.subject = "Subject %d" % ss
+        row.data = "x" * payload
+    return rows
+
+
+class Bench:
+
+    '''
+    Time each registered case across several scales. Every result reports
+    ops/s, p50 / p99 latency, as well as the peak (traced) memory.
+    '''
+
+    def __init__(self, scales=(100, 1000), names=None):
+        self.scales = scales
+        self.names = names if names else list(CASES)
+        self.results = OrderedDict()
+
+    def run(self, verbose=False):
+        ''' Run each case at each scale, returning the results. '''
+        for name in self.names:
+            for scale in self.scales:
+                key = "%s@%d" % (name, scale)
+                self.results[key] = Bench.Measure(CASES[name], scale)
+                if verbose:
+                    print(Bench.Format(key, self.results[key]))
+        return self.results
+
+    def save(self, file):
+        ''' Save the results as JSON. '''
+        with open(file, 'w') as fh:
+            json.dump(self.results, fh, indent=2)
+
+    def compare(self, file, tolerance=0.20):
+        ''' Compare against a baseline JSON file. Returns a list of the
+        (key, baseline ops/s, current ops/s) for each regression. '''
+        with open(file) as fh:
+            baseline = json.load(fh)
+        results = list()
+        for key in self.results:
+            if key not in baseline or self.results[key].get('skipped') or baseline[key].get('skipped'):
+                continue
+            was = baseline[key]['ops_per_sec']
+            now = self.results[key]['ops_per_sec']
+            if now < was * (1.0 - tolerance):
+                results.append((key, was, now))
+        return results
+
+    @staticmethod
+    def Measure(func, scale):
+        ''' Time a case, then re-run same under tracemalloc for peak memory.
+        Only the operation is traced - not the set-up of its fixture. '''
+        folder = tempfile.mkdtemp(prefix='zipbench')
+        try:
+            op, iterations, *extra = func(scale, folder)
+            times = list()
+            start = time.perf_counter()
+            for ss in range(iterations):
+                t0 = time.perf_counter_ns()
+                op()
+                times.append(time.perf_counter_ns() - t0)
+            total = time.perf_counter() - start
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+        folder = tempfile.mkdtemp(prefix='zipbench')
+        try:
+            op, iterations, *ignored = func(scale, folder)
+            tracemalloc.start()
+            for ss in range(iterations):
+                op()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            shutil.rmtree(folder, ignore_errors=True)
+        times.sort()
+        result = OrderedDict()
+        result['iterations'] = iterations
+        result['ops_per_sec'] = iterations / total if total else 0.0
+        result['p50_us'] = times[len(times) // 2] / 1000.0 if times else 0.0
+        result['p99_us'] = times[min(len(times) - 1, (len(times) * 99) // 100)] / 1000.0 if times else 0.0
+        result['peak_bytes'] = peak
+        for more in extra:
+            result.update(more)
+        return result
+
+    @staticmethod
+    def Format(key, result):
+        ''' A classic, user-displayable, result-line. '''
+        if result.get('skipped'):
+            return "%-32s skipped" % key
+        line = "%-32s %12.1f ops/s  p50 %10.2fus  p99 %10.2fus  peak %10d bytes" % (
+            key, result['ops_per_sec'], result['p50_us'], result['p99_us'], result['peak_bytes'])
+        if 'archive_bytes' in result:
+            line += "  archive %10d bytes" % result['archive_bytes']
+        if 'log_bytes' in result:
+            line += "  log %10d bytes/edit" % result['log_bytes']
+        return line
+
+
+@case('row_create')
+def bench_row_create(scale, folder):
+    return RowOne, scale
+
+
+@case('row_roundtrip')
+def bench_row_roundtrip(scale, folder):
+    row = RowOne()
+    row.subject = "Subject"
+    row.data = "x" * 256
+    return lambda: RowOne.FromString(RowOne.ToString(row)), scale
+
+
+@case('array_count')
+def bench_array_count(scale, folder):
+    rows = make_rows(scale)
+    return rows.count, 20
+
+
+@case('array_lookup')
+def bench_array_lookup(scale, folder):
+    rows = make_rows(scale)
+    keys = list(rows.get_subjects())
+    state = iter(keys * 2)
+    return lambda: rows.lookup(next(state)), len(keys)
+
+
+@case('array_pack')
+def bench_array_pack(scale, folder):
+    rows = make_rows(scale)
+    for key in list(rows.get_subjects())[::2]:
+        rows.delete(rows.lookup(key))
+    return rows.pack, 20
+
+
+@case('array_roundtrip')
+def bench_array_roundtrip(scale, folder):
+    rows = make_rows(scale)
+    return lambda: RowArray.FromString(RowArray.ToString(rows)), 5
+
+
+def update_op(rows):
+    ''' Change, then .update(), each row in turn. '''
+    keys = list(rows.get_subjects())
+    state = iter(range(len(keys) * 2))
+    def op():
+        ss = next(state)
+        row = rows.lookup(keys[ss % len(keys)])
+        row.subject = "Updated %d" % ss
+        return rows.update(row)
+    return op, len(keys)
+
+
+@case('array_update')
+def bench_array_update(scale, folder):
+    return update_op(make_rows(scale))
+
+
+@case('feed_update')
+def bench_feed_update(scale, folder):
+    ''' As array_update, with a persisted change feed attached. '''
+    rows = make_rows(scale)
+    ChangeFeed(rows, os.path.join(folder, 'bench.feed'), retain=1000)
+    return update_op(rows)
+
+
+@case('feed_resume')
+def bench_feed_resume(scale, folder):
+    ''' Catch up on the last 10 of "scale" changes. '''
+    rows = make_rows(scale)
+    feed = ChangeFeed(rows)
+    for key in rows.get_subjects():
+        row = rows.lookup(key)
+        row.subject = "Updated"
+        rows.update(row)
+    return lambda: feed.changes(feed.seq - 10), 1000
+
+
+@case('archive_next')
+def bench_archive_next(scale, folder):
+    archive = ZipArchiveBase(os.path.join(folder, 'bench.zdb'))
+    archive.archive_first("first", "first.txt")
+    message = RowOne.ToString(RowOne())
+    names = iter("member%d.txt" % ss for ss in range(scale))
+    return lambda: archive.archive_next(message, next(names)), min(scale, 200)
+
+
+@case('read_archive')
+def bench_read_archive(scale, folder):
+    archive = ZipArchiveBase(os.path.join(folder, 'bench.zdb'))
+    archive.archive_first(RowArray.ToString(make_rows(scale)), "ZibDB.txt")
+    return lambda: RowArray.FromString(archive.read_archive("ZibDB.txt")), 5
+
+
+def bench_codec(serializer, compressor, passphrase=None):
+    ''' Archive, then read, a RowArray using a codec. Reports the archived size. '''
+    def bench(scale, folder):
+        codec = Codec(serializer, compressor, Cipher(passphrase) if passphrase else None)
+        archive = ZipArchiveBase(os.path.join(folder, 'bench.zdb'), codec=codec)
+        rows = make_rows(scale, payload=256)
+        if serializer == 'text':
+            value = RowArray.ToString(rows)
+        else:
+            value = RowArray.ToList(rows)
+        def op():
+            archive.archive_first(value, "ZibDB.txt", overwrite=True)
+            return RowArray.FromString(archive.read_archive("ZibDB.txt"))
+        op()
+        return op, 5, {'archive_bytes': os.path.getsize(archive.file)}
+    return bench
+
+for zser in ('text', 'repr', 'json', 'bin'):
+    for zcomp in [None] + sorted(COMPRESSORS):
+        case('codec_' + Codec(zser, zcomp).name)(bench_codec(zser, zcomp))
+
+if AESGCM:
+    # Encryption overhead: compare each against its plaintext codec case.
+    for zser, zcomp in (('text', None), ('text', 'zlib'), ('bin', None), ('bin', 'zlib')):
+        case('codec_' + Codec(zser, zcomp).name + '+' + Cipher.NAME)(bench_codec(zser, zcomp, "Bench"))
+
+
+@case('blob_save')
+def bench_blob_save(scale, folder):
+    archive = ZipArchiveBase(os.path.join(folder, 'bench.zdb'))
+    store = BlobStore(archive)
+    rows = make_rows(scale, payload=BlobStore.THRESHOLD * 4)
+    def op():
+        archive.destroy()
+        return store.save(rows, "ZibDB.txt")
+    op()
+    return op, 5, {'archive_bytes': os.path.getsize(archive.file)}
+
+
+@case('paged_update')
+def bench_paged_update(scale, folder):
+    rows = PagedRowArray(os.path.join(folder, 'bench.zdp'))
+    zrows = make_rows(scale)
+    for key in zrows.get_subjects():
+        rows.append(zrows.lookup(key))
+    keys = list(rows.get_subjects())
+    state = iter(keys * 2)
+    def op():
+        row = rows.lookup(next(state))
+        row.subject = "Updated"
+        return rows.update(row)
+    return op, len(keys)
+
+
+@case('zip_update')
+def bench_zip_update(scale, folder):
+    archive = ZipArchiveBase(os.path.join(folder, 'bench.zdb'))
+    rows = make_rows(scale)
+    keys = list(rows.get_subjects())
+    state = iter(keys * 2)
+    def op():
+        rows.lookup(next(state)).subject = "Updated"
+        return archive.archive_first(RowArray.ToString(rows), "ZibDB.txt", overwrite=True)
+    return op, min(len(keys), 20)
+
+
+@case('wal_update')
+def bench_wal_update(scale, folder):
+    archive = ZipArchiveBase(os.path.join(folder, 'bench.zdb'))
+    rows = LoggedRowArray(archive)
+    zrows = make_rows(scale)
+    for key in zrows.get_subjects():
+        rows.append(zrows.lookup(key))
+    rows.checkpoint()
+    keys = list(rows.get_subjects())
+    state = iter(keys * 2)
+    def op():
+        row = rows.lookup(next(state))
+        row.subject = "Updated"
+        return rows.update(row)
+    return op, len(keys)
+
+
+@case('wal_edit')
+def bench_wal_edit(scale, folder):
+    ''' Small edits to large notes. Reports the log bytes per edit. '''
+    archive = ZipArchiveBase(os.path.join(folder, 'bench.zdb'))
+    rows = LoggedRowArray(archive)
+    zrows = make_rows(min(scale, 32), payload=65536)
+    for key in zrows.get_subjects():
+        rows.append(zrows.lookup(key))
+    rows.checkpoint()
+    keys = list(rows.get_subjects())
+    state = iter(range(len(keys) * 4))
+    def op():
+        ss = next(state)
+        row = rows.lookup(keys[ss % len(keys)])
+        row.data = row.data[:ss] + "Edit. " + row.data[ss:]
+        return rows.update(row)
+    for ss in range(len(keys)):
+        op()  # The first edit after a checkpoint logs the whole row.
+    size = rows.log.size()
+    for ss in range(len(keys)):
+        op()
+    per_edit = (rows.log.size() - size) // len(keys)
+    return op, len(keys) * 2, {'log_bytes': per_edit}
+
+
+@case('id_locate')
+def bench_id_locate(scale, folder):
+    indexes = list()
+    keys = list()
+    for number in range(10):
+        archive = ZipArchiveBase(os.path.join(folder, 'bench%d.zdb' % number))
+        rows = make_rows(scale)
+        keys.extend(rows.get_subjects())
+        archive.archive_first(RowArray.ToString(rows), "ZibDB.txt")
+        index = IdIndex(archive)
+        index.build()
+        indexes.append(index)
+    state = iter((keys + ["missing"] * len(keys)) * 2)
+    return lambda: IdIndex.Locate(indexes, next(state)), min(len(keys) * 2, 2000)
+
+
+@case('cache_click')
+def bench_cache_click(scale, folder):
+    ''' Click back and forth through a paged RowArray, as the GUI would. '''
+    rows = PagedRowArray(os.path.join(folder, 'bench.zdp'))
+    zrows = make_rows(scale, payload=2048)
+    for key in zrows.get_subjects():
+        rows.append(zrows.lookup(key))
+    keys = list(rows.get_subjects())
+    cache = RowCache(rows)
+    clicks = iter([ss % 10 for ss in range(scale * 2)])
+    return lambda: cache.focus(keys, next(clicks)), scale
+
+
+@case('save_string')
+def bench_save_string(scale, folder):
+    archive = ZipArchiveBase(os.path.join(folder, 'bench.zdb'))
+    rows = make_rows(scale, payload=1024)
+    return lambda: archive.archive_first(RowArray.ToString(rows), "ZibDB.txt", overwrite=True), 5
+
+
+@case('save_stream')
+def bench_save_stream(scale, folder):
+    archive = ZipArchiveBase(os.path.join(folder, 'bench.zdb'))
+    rows = make_rows(scale, payload=1024)
+    return lambda: archive.archive_first(RowArray.IterString(rows), "ZibDB.txt", overwrite=True), 5
+
+
+def first_paint_setup(scale, folder):
+    ''' An archive of "scale" 1KB notes, plus a last-session snapshot of same. '''
+    archive = ZipArchiveBase(os.path.join(folder, 'bench.zdb'))
+    rows = make_rows(scale, payload=1024)
+    archive.archive_first(RowArray.ToString(rows), "ZibDB.txt")
+    subjects = rows.get_subjects()
+    ids = list(subjects)
+    LastSession(folder).save(archive.file, ids, subjects, 0)
+    return archive
+
+
+@case('first_paint_archive')
+def bench_first_paint_archive(scale, folder):
+    ''' What the window needs before painting, when read from the archive. '''
+    archive = first_paint_setup(scale, folder)
+    def op():
+        rows = RowArray.FromString(archive.read_archive("ZibDB.txt"))
+        subjects = rows.get_subjects()
+        return [subjects[key] for key in list(subjects)[:LastSession.PAGE]], rows.lookup(list(subjects)[0])
+    return op, 5
+
+
+@case('first_paint_snapshot')
+def bench_first_paint_snapshot(scale, folder):
+    ''' What the window needs before painting, when read from the last session. '''
+    first_paint_setup(scale, folder)
+    def op():
+        session = LastSession(folder)
+        session.load()
+        return [subject for key, subject in session.page], session.selected
+    return op, 5
+
+
+def gui_available():
+    ''' True when a window can be created. '''
+    try:
+        import tkinter
+        tkinter.Tk().destroy()
+        return True
+    except Exception:
+        return False
+
+
+@case('gui_first_paint')
+def bench_gui_first_paint(scale, folder):
+    ''' Time-to-first-paint: from creating the window, to its first update.
+    Runs only when a display is available. '''
+    if not gui_available():
+        return (lambda: None), 0, {'skipped': True}
+    from GUI.mainGUI import AppGUI
+    first_paint_setup(scale, folder)
+    def op():
+        app = AppGUI(home_dir=folder)
+        app.update()
+        app.destroy()
+    return op, 5
+
+
+@case('save_stream_encrypted')
+def bench_save_stream_encrypted(scale, folder):
+    if not AESGCM:
+        return (lambda: None), 0, {'skipped': True}
+    archive = ZipArchiveBase(os.path.join(folder, 'bench.zdb'), codec=Codec(cipher=Cipher("Bench")))
+    rows = make_rows(scale, payload=1024)
+    return lambda: archive.archive_first(RowArray.IterString(rows), "ZibDB.txt", overwrite=True), 5
+
+
+def sync_setup(scale, folder):
+    ''' Two copies of "scale" 1KB notes, spread across five years of months. '''
+    rows = make_rows(scale, payload=1024)
+    now = int(time.time())
+    for ss, key in enumerate(list(rows.get_subjects())):
+        rows.lookup(key).time = now - (ss % 1800) * 24 * 60 * 60
+    sides = list()
+    for name in ('left', 'right'):
+        archive = ZipArchiveBase(os.path.join(folder, name + '.zdb'))
+        sides.append(TimePartitions(archive))
+        sides[-1].save(rows, now=now)
+    return rows, sides
+
+
+@case('sync_partitions')
+def bench_sync_partitions(scale, folder):
+    ''' Add a row to one copy, then sync both by partition digests. '''
+    rows, sides = sync_setup(scale, folder)
+    sync = ArchiveSync(*sides)
+    def op():
+        row = RowOne()
+        name = sides[0].PART_DIR + sides[0].bucket(row.time)
+        bucket = sides[0].read(name)
+        bucket.append(row)
+        sides[0].replace({name: bucket})
+        return sync.run()
+    return op, 5
+
+
+@case('sync_full')
+def bench_sync_full(scale, folder):
+    ''' Add a row to one copy, then merge both by reading everything. '''
+    rows, sides = sync_setup(scale, folder)
+    archives = list()
+    for side in sides:
+        archive = ZipArchiveBase(side.archive.file + '.full')
+        archive.archive_first(RowArray.ToString(rows), "ZibDB.txt")
+        archives.append(archive)
+    def op():
+        left, right = [RowArray.FromString(archive.read_archive("ZibDB.txt")) for archive in archives]
+        left.create()
+        for key, row in list(left._db.items()) + list(right._db.items()):
+            for zrows in (left, right):
+                was = zrows.lookup(key)
+                if was is None or was.time < row.time:
+                    zrows.append(row)
+        for archive, zrows in zip(archives, (left, right)):
+            archive.archive_first(RowArray.ToString(zrows), "ZibDB.txt", overwrite=True)
+    return op, 5
+
+
+def typed_setup(scale, folder):
+    ''' Rows sporting an int, a float, a timestamp, and an enum user field. '''
+    schema = FieldSchema()
+    schema.add('stars', 'int')
+    schema.add('price', 'float')
+    schema.add('due', 'timestamp')
+    schema.add('color', 'enum', ['red', 'green', 'blue'])
+    rows = make_rows(scale)
+    for ss, key in enumerate(list(rows.get_subjects())):
+        row = rows.lookup(key)
+        row.set('stars', ss % 5)
+        row.set('price', ss * 0.5)
+        row.set('due', 1700000000 + ss * 3600)
+        row.set('color', ['red', 'green', 'blue'][ss % 3])
+    archive = ZipArchiveBase(os.path.join(folder, 'bench.zdb'))
+    return schema, rows, archive
+
+
+@case('typed_filter')
+def bench_typed_filter(scale, folder):
+    ''' Read, then filter, rows using typed columns. '''
+    schema, rows, archive = typed_setup(scale, folder)
+    schema.archive_rows(archive, rows, "ZibDB.typ")
+    def op():
+        columns = schema.read_columns(archive, "ZibDB.typ")
+        mask = columns.where('stars', '>=', 3)
+        mask = columns.where('color', '==', 'blue', mask)
+        return columns.rows(mask)
+    return op, 5, {'archive_bytes': os.path.getsize(archive.file)}
+
+
+@case('untyped_filter')
+def bench_untyped_filter(scale, folder):
+    ''' As typed_filter, using repr()-archived rows. '''
+    schema, rows, archive = typed_setup(scale, folder)
+    archive.archive_first(RowArray.ToString(rows), "ZibDB.txt")
+    def op():
+        zrows = RowArray.FromString(archive.read_archive("ZibDB.txt"))
+        results = RowArray()
+        for key, row in zrows._db.items():
+            if row.get('stars') >= 3 and row.get('color') == 'blue':
+                results.append(row)
+        return results
+    return op, 5, {'archive_bytes': os.path.getsize(archive.file)}
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="ZipDB benchmark suite.")
+    parser.add_argument('--scale', type=int, nargs='+', default=[100, 1000],
+                        help="Row counts to run each case at.")
+    parser.add_argument('--case', nargs='+', choices=list(CASES), default=None,
+                        help="Cases to run. Default is all of them.")
+    parser.add_argument('--out', default=None, help="Save the JSON results here.")
+    parser.add_argument('--baseline', default=None, help="Compare against this JSON file.")
+    parser.add_argument('--tolerance', type=float, default=0.20,
+                        help="Allowed ops/s loss before a regression is reported.")
+    args = parser.parse_args(argv)
+    bench = Bench(scales=args.scale, names=args.case)
+    bench.run(verbose=True)
+    if args.out:
+        bench.save(args.out)
+    if args.baseline:
+        regressions = bench.compare(args.baseline, args.tolerance)
+        for key, was, now in regressions:
+            print("REGRESSION %s: %.1f -> %.1f ops/s" % (key, was, now))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())